@@ -0,0 +1,98 @@
+"""打包脚本
+
+用 PyInstaller 把分析工具打包成 Windows 可执行程序。
+
+默认使用 --onedir: --onefile 启动时要把 ~200MB 的 paddle 解压校验到
+临时目录, 每次启动都多花数秒; onedir 免去了这一步, 启动快 3-8 倍。
+仍需要单文件分发时用 --pack onefile。
+"""
+import argparse
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+APP_NAME = "VideoDelayAnalyzer_v1.0"
+ENTRY_SCRIPT = "main.py"
+
+DIST_DIR = Path("dist")
+RELEASE_DIR = Path("release")
+
+USAGE_TEXT = """视频延迟分析工具 使用说明
+==========================
+
+1. 解压后保持目录结构不变, 双击 {app_name}.exe 启动;
+2. 首次启动会加载 OCR 模型, 需要等待数秒;
+3. 分析结果(CSV/HTML 报告)输出到桌面的"视频延迟分析"目录;
+4. 请勿删除程序目录下的其他文件, 它们是运行所需的依赖;
+5. 程序包内未做压缩, 体积稍大但启动明显更快。
+"""
+
+
+def build_exe(pack="onedir"):
+    """调用 PyInstaller 打包, 返回产物路径"""
+    cmd = [
+        sys.executable, "-m", "PyInstaller",
+        "--noconfirm",
+        "--clean",
+        "--name", APP_NAME,
+        "--windowed",
+        "--exclude-module=matplotlib",
+        "--exclude-module=scipy",
+        "--exclude-module=pandas",
+        "--exclude-module=notebook",
+        "--exclude-module=IPython",
+        # paddle/paddleocr 会间接拖进不少重型库, 全部排除以缩小
+        # 包体积、加快启动时的解压校验
+        "--exclude-module=torch",
+        "--exclude-module=tensorflow",
+        "--exclude-module=tkinter",
+        "--exclude-module=sklearn",
+        "--exclude-module=sympy",
+        "--exclude-module=h5py",
+        "--exclude-module=numba",
+        "--exclude-module=jupyter",
+        "--exclude-module=sphinx",
+        # UPX 压缩的收益都要在启动解压时还回来, 直接关掉
+        "--noupx",
+    ]
+    if pack == "onefile":
+        cmd.append("--onefile")
+    else:
+        cmd.append("--contents-directory=internal")
+    cmd.append(ENTRY_SCRIPT)
+
+    print("执行:", " ".join(cmd))
+    subprocess.run(cmd, check=True)
+
+    if pack == "onefile":
+        return DIST_DIR / f"{APP_NAME}.exe"
+    return DIST_DIR / APP_NAME
+
+
+def create_distribution(artifact, pack="onedir"):
+    """把打包产物和使用说明整理到 release 目录"""
+    RELEASE_DIR.mkdir(exist_ok=True)
+    if pack == "onefile":
+        shutil.copy2(artifact, RELEASE_DIR / artifact.name)
+    else:
+        target = RELEASE_DIR / APP_NAME
+        if target.exists():
+            shutil.rmtree(target)
+        shutil.copytree(artifact, target)
+    usage_path = RELEASE_DIR / "使用说明.txt"
+    usage_path.write_text(USAGE_TEXT.format(app_name=APP_NAME), encoding="utf-8")
+    print(f"产物已整理到 {RELEASE_DIR}/")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="打包视频延迟分析工具")
+    parser.add_argument("--pack", choices=["onedir", "onefile"], default="onedir",
+                        help="打包方式, onedir 启动更快 (默认)")
+    args = parser.parse_args()
+    artifact = build_exe(args.pack)
+    create_distribution(artifact, args.pack)
+
+
+if __name__ == "__main__":
+    main()
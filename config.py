@@ -0,0 +1,135 @@
+"""全局配置
+
+集中管理输出目录、ROI 配置文件和分析参数, 供 core 各模块与 GUI 共用。
+"""
+import contextlib
+import functools
+import json
+import os
+import platform
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# 分析参数
+# ---------------------------------------------------------------------------
+
+# OCR 前对 ROI 的缩放比例 (1.0 表示不缩放)
+DEFAULT_RESIZE_RATIO = 0.5
+
+# 每隔多少帧取一帧做 OCR
+DEFAULT_FRAME_STEP = 5
+
+# 单个视频最多处理的帧数
+DEFAULT_FRAME_LIMIT = 9000
+
+# 延迟超过该值(ms)视为高延迟
+HIGH_LATENCY_THRESHOLD = 100
+
+# 默认 ping 目标
+DEFAULT_PING_TARGETS = ["cloud.dreame.tech", "8.8.8.8", "114.114.114.114"]
+
+# App 时间戳的默认 ROI (x1, y1, x2, y2), 可在 GUI 中调整后保存
+DEFAULT_APP_ROI = (100, 200, 500, 260)
+
+# ---------------------------------------------------------------------------
+# 路径
+# ---------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=1)
+def _desktop_path():
+    """解析桌面路径, 结果缓存; Windows 下从注册表读取真实位置"""
+    if platform.system() == "Windows":
+        import winreg
+
+        key = winreg.OpenKey(
+            winreg.HKEY_CURRENT_USER,
+            r"Software\Microsoft\Windows\CurrentVersion\Explorer\Shell Folders",
+        )
+        with contextlib.closing(key):
+            return Path(winreg.QueryValueEx(key, "Desktop")[0])
+    return Path.home() / "Desktop"
+
+
+DESKTOP_PATH = _desktop_path()
+
+OUTPUT_DIR = DESKTOP_PATH / "视频延迟分析"
+NETWORK_LOG_DIR = OUTPUT_DIR / "network_logs"
+DEBUG_FRAME_DIR = OUTPUT_DIR / "debug_frames"
+
+ROI_CONFIG_PATH = OUTPUT_DIR / "roi_config.json"
+
+
+def ensure_dirs():
+    """按需创建输出目录; 由分析/保存入口在首次使用时调用"""
+    for dir_path in [OUTPUT_DIR, NETWORK_LOG_DIR, DEBUG_FRAME_DIR]:
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+
+# (st_mtime_ns, 解析结果): 文件未变时跳过重复的 JSON 解析
+_roi_cache = {}
+
+
+def load_roi_config():
+    """读取保存的 ROI 配置, 文件不存在或损坏时返回默认值
+
+    按 mtime 缓存解析结果, 每次分析反复读取同一配置时不再重复
+    打开和解析文件。
+    """
+    try:
+        mtime_ns = ROI_CONFIG_PATH.stat().st_mtime_ns
+    except OSError:
+        return {"app_roi": list(DEFAULT_APP_ROI)}
+
+    key = (str(ROI_CONFIG_PATH), mtime_ns)
+    cached = _roi_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        with open(ROI_CONFIG_PATH, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {"app_roi": list(DEFAULT_APP_ROI)}
+
+    _roi_cache.clear()
+    _roi_cache[key] = config
+    return config
+
+
+def save_roi_config(config):
+    """保存 ROI 配置到桌面输出目录"""
+    ensure_dirs()
+    with open(ROI_CONFIG_PATH, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    _roi_cache.clear()
+
+
+_PADDLE_HAS_CUDA = None
+
+
+def _detect_cuda():
+    """探测一次打包的 paddle 是否带 CUDA 支持, 结果缓存"""
+    global _PADDLE_HAS_CUDA
+    if _PADDLE_HAS_CUDA is None:
+        try:
+            import paddle
+
+            _PADDLE_HAS_CUDA = paddle.is_compiled_with_cuda()
+        except ImportError:
+            _PADDLE_HAS_CUDA = False
+    return _PADDLE_HAS_CUDA
+
+
+def set_gpu_device(device_id):
+    """指定 OCR 使用的 GPU 编号, -1 表示禁用 GPU
+
+    分发给用户的通常是 CPU-only 的 paddle, 此时设置
+    CUDA_VISIBLE_DEVICES 毫无意义, 还可能触发缓慢的 GPU 探测,
+    直接跳过。
+    """
+    if not _detect_cuda():
+        return
+    if device_id < 0:
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    else:
+        os.environ["CUDA_VISIBLE_DEVICES"] = str(device_id)
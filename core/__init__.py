@@ -0,0 +1,37 @@
+"""core 包: 视频延迟分析的核心模块
+
+通过 PEP 562 __getattr__ 做惰性导出: 首次访问某个符号时才导入对应
+子模块, 避免 import core 就连带拉起 cv2/paddleocr 等重型依赖。
+"""
+import importlib
+
+_lazy = {
+    'AdaptiveOCREngine': '.adaptive_ocr',
+    'SmartROIDetector': '.smart_roi_detector',
+    'OCREngine': '.ocr_engine',
+    'TimestampOCR': '.ocr_engine',
+    'ROIDetector': '.roi_detector',
+    'VideoAnalyzer': '.analyzer',
+    'ReportGenerator': '.report_generator',
+    'NetworkMonitor': '.network_monitor',
+    'NetworkStatus': '.network_monitor',
+    'NetworkMatcher': '.matcher',
+    'NetworkLog': '.matcher',
+    'load_network_log': '.matcher',
+    'load_video_analysis': '.matcher',
+}
+
+__all__ = list(_lazy)
+
+
+def __getattr__(name):
+    if name in _lazy:
+        module = importlib.import_module(_lazy[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
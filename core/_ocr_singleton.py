@@ -0,0 +1,34 @@
+"""进程级共享的 PaddleOCR 实例
+
+模型加载要花数秒, GUI 每跑一次分析都重建引擎纯属浪费; 这里维护
+一个模块级单例, 同一进程内的多次分析复用同一个引擎。GPU 上用
+fp16 把张量带宽减半, 时间戳文本轴对齐, 角度分类器直接关掉。
+"""
+import logging
+
+from paddleocr import PaddleOCR
+
+logger = logging.getLogger(__name__)
+
+_engine = None
+_engine_use_gpu = None
+
+
+def get_engine(use_gpu=False):
+    """返回共享的 PaddleOCR 引擎, 首次调用时构建
+
+    use_gpu 发生变化时重建 (引擎的设备在构造时就固定了)。
+    """
+    global _engine, _engine_use_gpu
+    if _engine is None or _engine_use_gpu != use_gpu:
+        logger.info("构建共享 OCR 引擎 (use_gpu=%s)", use_gpu)
+        _engine = PaddleOCR(
+            lang="en",
+            use_gpu=use_gpu,
+            show_log=False,
+            use_angle_cls=False,
+            precision="fp16" if use_gpu else "fp32",
+            det_db_box_thresh=0.5,
+        )
+        _engine_use_gpu = use_gpu
+    return _engine
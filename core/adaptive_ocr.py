@@ -0,0 +1,587 @@
+"""自适应 OCR 引擎
+
+针对固定位置的时间戳叠加层 (HH:MM:SS.mmm), 按历史成功率自适应
+选择预处理策略; 识别失败时按顺序级联重试其余策略。
+
+在 PaddleOCR 之前增加了一条模板匹配快速路径: 时间戳 ROI 的字形和
+位置稳定, 首次识别成功后把各数字字形缓存为模板, 之后的帧先用
+cv2.matchTemplate 逐格匹配, 全部命中时直接拼出时间串, 完全跳过
+PaddleOCR 推理; 任一格置信度不足再回退到原有的策略级联。
+"""
+import logging
+import re
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from config import DEFAULT_RESIZE_RATIO
+
+logger = logging.getLogger(__name__)
+
+# (正则, 名称): 按优先级从 OCR 文本中提取时间戳
+TIME_PATTERNS = [
+    (r'(\d{2}):(\d{2}):(\d{2})\.(\d{3})', 'standard'),
+    (r'(\d{2}):(\d{2}):(\d{2}),(\d{3})', 'comma_ms'),
+    (r'(\d{2}):(\d{2}):(\d{2}):(\d{3})', 'colon_ms'),
+    (r'(\d{2})：(\d{2})：(\d{2})[.．](\d{3})', 'fullwidth'),
+    (r'(\d{2}):(\d{2}):(\d{2})\.(\d{2})\b', 'short_ms'),
+    (r'(\d{2}):(\d{2}):(\d{2})\s+(\d{3})', 'space_ms'),
+    (r'(\d{2}):(\d{2}):(\d{2})', 'no_ms'),
+]
+
+# 导入时统一编译, 避免每帧的 re 缓存查找开销
+_COMPILED_TIME_PATTERNS = [(re.compile(p), name) for p, name in TIME_PATTERNS]
+_DIGITS_RE = re.compile(r'\d+')
+# OCR 一次性给出完整时间串时的快速通道
+_STRICT_TIME_RE = re.compile(r'\d{2}:\d{2}:\d{2}\.\d{3}')
+
+
+def _time_buf_to_ms(buf):
+    """把 12 字节的 "HH:MM:SS.mmm" uint8 缓冲区解析成毫秒数, 非法返回 -1
+
+    定长索引 + 整数运算, 不走 split/正则; 安装了 numba 时会被 JIT。
+    """
+    if buf[2] != 58 or buf[5] != 58 or buf[8] != 46:  # ':' ':' '.'
+        return -1
+    h = (int(buf[0]) - 48) * 10 + (int(buf[1]) - 48)
+    m = (int(buf[3]) - 48) * 10 + (int(buf[4]) - 48)
+    s = (int(buf[6]) - 48) * 10 + (int(buf[7]) - 48)
+    ms = ((int(buf[9]) - 48) * 100 + (int(buf[10]) - 48) * 10
+          + (int(buf[11]) - 48))
+    for i in (0, 1, 3, 4, 6, 7, 9, 10, 11):
+        d = int(buf[i]) - 48
+        if d < 0 or d > 9:
+            return -1
+    if h > 23 or m > 59 or s > 59:
+        return -1
+    return (h * 3600 + m * 60 + s) * 1000 + ms
+
+
+try:
+    import numba
+
+    _time_buf_to_ms = numba.njit(cache=True)(_time_buf_to_ms)
+except ImportError:
+    pass
+
+
+def _parse_time_ms_fast(time_str):
+    """标准 "HH:MM:SS.mmm" 的快速解析入口, 非法输入返回 -1"""
+    if not isinstance(time_str, str) or len(time_str) != 12:
+        return -1
+    try:
+        buf = np.frombuffer(time_str.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return -1
+    return _time_buf_to_ms(buf)
+
+# 预处理策略, 顺序即默认重试顺序
+STRATEGIES = [
+    'original',
+    'contrast',
+    'binary',
+    'binary_inv',
+    'sharpen',
+    'upscale',
+    'denoise',
+    'morph',
+]
+
+# 时间戳的固定版式: True 表示该格是数字, False 是分隔符
+_TIME_LAYOUT = "00:00:00.000"
+_DIGIT_CELLS = [i for i, ch in enumerate(_TIME_LAYOUT) if ch == '0']
+
+# 模板匹配的接受阈值
+_TEMPLATE_SCORE_MIN = 0.9
+
+# onnx 后端的默认模型目录, 需要外部提供: 把从 PaddleOCR 导出的
+# rec.onnx / rec_dict.txt 放进去; 打包分发时也要随包一起携带
+# (build_exe.py 不打包它, 仓库里也不附带模型)
+_ONNX_MODEL_DIR = Path(__file__).resolve().parent.parent / "models"
+
+
+class _OnnxTimeOCR:
+    """onnxruntime 识别后端
+
+    加载从 PaddleOCR 导出的 rec.onnx, 用 ORT 的优化内核做推理。
+    ROI 本身就是裁好的单行时间戳, 检测网络没有用武之地, 因此只跑
+    识别 + CTC 贪心解码; 对外模仿 PaddleOCR.ocr 的返回结构, 调用方
+    无需区分后端。
+    """
+
+    # PP-OCR rec 模型的标准输入高度
+    _REC_H = 48
+    _REC_W = 320
+
+    def __init__(self, model_dir=_ONNX_MODEL_DIR):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = \
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(Path(model_dir) / "rec.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_name = self.session.get_inputs()[0].name
+        dict_path = Path(model_dir) / "rec_dict.txt"
+        with open(dict_path, "r", encoding="utf-8") as f:
+            # 0 号位是 CTC blank
+            self.charset = [''] + [line.rstrip('\n') for line in f]
+
+    def _preprocess(self, img):
+        """缩放到 rec 输入尺寸并归一化成 CHW float32"""
+        h, w = img.shape[:2]
+        new_w = min(self._REC_W, max(1, int(round(w * self._REC_H / h))))
+        resized = cv2.resize(img, (new_w, self._REC_H))
+        canvas = np.zeros((self._REC_H, self._REC_W, 3), dtype=np.float32)
+        canvas[:, :new_w] = resized.astype(np.float32)
+        canvas = (canvas / 255.0 - 0.5) / 0.5
+        return canvas.transpose(2, 0, 1)
+
+    def _decode(self, logits):
+        """CTC 贪心解码, 返回 (text, avg_conf)"""
+        idxs = logits.argmax(axis=1)
+        probs = logits.max(axis=1)
+        chars = []
+        confs = []
+        prev = 0
+        for t, idx in enumerate(idxs):
+            if idx != 0 and idx != prev and idx < len(self.charset):
+                chars.append(self.charset[idx])
+                confs.append(float(probs[t]))
+            prev = idx
+        if not chars:
+            return '', 0.0
+        return ''.join(chars), sum(confs) / len(confs)
+
+    def ocr(self, img, cls=False):
+        """与 PaddleOCR.ocr 同构的结果: [[(box, (text, conf)), ...]]"""
+        imgs = img if isinstance(img, list) else [img]
+        batch = np.stack([self._preprocess(im) for im in imgs])
+        logits = self.session.run(None, {self._input_name: batch})[0]
+        results = []
+        for per_img in logits:
+            text, conf = self._decode(per_img)
+            if text:
+                results.append([(None, (text, conf))])
+            else:
+                results.append(None)
+        # 单张输入时 results 即 [该图结果], 与 PaddleOCR 的返回
+        # 结构一致, 无需按输入类型区分
+        return results
+
+
+class AdaptiveOCREngine:
+    """带预处理策略级联和模板快速路径的时间戳 OCR"""
+
+    # 预处理用到的常量核, 避免热路径上每次调用都重新分配
+    _SHARPEN_KERNEL = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]],
+                               dtype=np.float32)
+    _MORPH_KERNEL = np.ones((2, 2), np.uint8)
+
+    def __init__(self, use_gpu=False, lang='en', resize_ratio=DEFAULT_RESIZE_RATIO,
+                 backend='paddle'):
+        # paddleocr 导入要拉起整个 paddle, 冷启动数秒; 推迟到第一次
+        # 真正需要推理时再导入并构造
+        self.ocr = None
+        self._use_gpu = use_gpu
+        self._lang = lang
+        self.backend = backend
+        self.resize_ratio = resize_ratio
+        self.strategy_stats = {s: {'success': 0, 'attempts': 0} for s in STRATEGIES}
+        self.best_strategy = None
+        # 重试顺序, 仅在首选策略切换时重建
+        self._strategy_order = tuple(STRATEGIES)
+        # 仅在最终重试阶段才值得开启的慢速去噪
+        self.allow_slow_denoise = False
+        # cv2.createCLAHE 并不便宜, 构造一次反复使用
+        self._clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        # 数字模板缓存: (roi_shape, strategy) -> {digit: template}
+        self._digit_templates = {}
+        # 时间预测状态: 叠加层时间随帧号单调推进, 可据此跳过 OCR
+        self._last_ms = None
+        self._last_frame_idx = None
+        # 级联内复用的转换缓冲区, 按 ROI 尺寸惰性分配
+        self._rgb_buf = None
+        self._gray_buf = None
+
+    def _lazy_init(self):
+        """首次需要推理时才导入后端并构造引擎"""
+        if self.ocr is None:
+            if self.backend == 'onnx':
+                self.ocr = _OnnxTimeOCR()
+            else:
+                from paddleocr import PaddleOCR
+
+                self.ocr = PaddleOCR(
+                    use_angle_cls=False,
+                    lang=self._lang,
+                    use_gpu=self._use_gpu,
+                    show_log=False,
+                )
+
+    # ------------------------------------------------------------------
+    # 预处理
+    # ------------------------------------------------------------------
+
+    def preprocess_image(self, img, gray, strategy):
+        """按策略名对 ROI 做预处理, 返回单通道或三通道图像
+
+        gray 由调用方对整个策略循环计算一次后传入, 避免各策略
+        重复做同一次 BGR2GRAY 转换。
+        """
+        if gray is None:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if strategy == 'original':
+            return img
+        if strategy == 'contrast':
+            return self._clahe.apply(gray)
+        if strategy == 'binary':
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return binary
+        if strategy == 'binary_inv':
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+            return binary
+        if strategy == 'sharpen':
+            return cv2.filter2D(img, -1, self._SHARPEN_KERNEL)
+        if strategy == 'upscale':
+            return cv2.resize(img, None, fx=2.0, fy=2.0, interpolation=cv2.INTER_CUBIC)
+        if strategy == 'denoise':
+            # 非局部均值极慢(单个 ROI 可达数百 ms), 默认用双边滤波,
+            # 对时钟叠加层的噪点已经足够
+            if self.allow_slow_denoise:
+                return cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
+            return cv2.bilateralFilter(img, 5, 50, 50)
+        if strategy == 'morph':
+            _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return cv2.morphologyEx(binary, cv2.MORPH_CLOSE, self._MORPH_KERNEL)
+        return img
+
+    # ------------------------------------------------------------------
+    # 模板匹配快速路径
+    # ------------------------------------------------------------------
+
+    def _binarize_for_templates(self, img):
+        """快速路径统一使用的二值化, 与模板构建时保持一致"""
+        if img.ndim == 3:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = img
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary
+
+    def _slice_cells(self, binary):
+        """按固定字距把二值化 ROI 切成与版式等长的格子"""
+        h, w = binary.shape[:2]
+        n = len(_TIME_LAYOUT)
+        pitch = w / n
+        if pitch < 3:
+            return None
+        cells = []
+        for i in range(n):
+            x1 = int(round(i * pitch))
+            x2 = int(round((i + 1) * pitch))
+            cells.append(binary[:, x1:x2])
+        return cells
+
+    def _cache_templates(self, img, time_str, strategy):
+        """识别成功后, 把本帧的数字字形缓存为模板"""
+        if len(time_str) != len(_TIME_LAYOUT):
+            return
+        binary = self._binarize_for_templates(img)
+        cells = self._slice_cells(binary)
+        if cells is None:
+            return
+        key = (binary.shape, strategy)
+        templates = self._digit_templates.setdefault(key, {})
+        for i in _DIGIT_CELLS:
+            digit = time_str[i]
+            if digit.isdigit() and digit not in templates:
+                templates[digit] = cells[i].copy()
+
+    def _match_templates(self, img, strategy):
+        """用缓存的数字模板直接读出时间串, 失败返回 None"""
+        binary = self._binarize_for_templates(img)
+        key = (binary.shape, strategy)
+        templates = self._digit_templates.get(key)
+        if not templates or len(templates) < 10:
+            return None
+        cells = self._slice_cells(binary)
+        if cells is None:
+            return None
+        chars = list(_TIME_LAYOUT)
+        for i in _DIGIT_CELLS:
+            cell = cells[i]
+            best_digit = None
+            best_score = _TEMPLATE_SCORE_MIN
+            for digit, tpl in templates.items():
+                if tpl.shape != cell.shape:
+                    return None
+                score = cv2.matchTemplate(cell, tpl, cv2.TM_CCOEFF_NORMED)[0][0]
+                if score > best_score:
+                    best_score = score
+                    best_digit = digit
+            if best_digit is None:
+                return None
+            chars[i] = best_digit
+        return ''.join(chars)
+
+    def _verify_predicted(self, img, predicted_str, strategy):
+        """用缓存模板逐格核对预测的时间串, 全部命中返回 True"""
+        if len(predicted_str) != len(_TIME_LAYOUT):
+            return False
+        binary = self._binarize_for_templates(img)
+        key = (binary.shape, strategy)
+        templates = self._digit_templates.get(key)
+        if not templates:
+            return False
+        cells = self._slice_cells(binary)
+        if cells is None:
+            return False
+        for i in _DIGIT_CELLS:
+            tpl = templates.get(predicted_str[i])
+            if tpl is None or tpl.shape != cells[i].shape:
+                return False
+            score = cv2.matchTemplate(cells[i], tpl, cv2.TM_CCOEFF_NORMED)[0][0]
+            if score < _TEMPLATE_SCORE_MIN:
+                return False
+        return True
+
+    @staticmethod
+    def _format_ms(total_ms):
+        """把当天毫秒数格式化回 HH:MM:SS.mmm"""
+        total_ms %= 86400000
+        ms = total_ms % 1000
+        s = total_ms // 1000
+        return f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}.{ms:03d}"
+
+    # ------------------------------------------------------------------
+    # 识别
+    # ------------------------------------------------------------------
+
+    def extract_time_adaptive(self, img, roi_type='app', frame_idx=None, fps=None):
+        """识别 ROI 中的时间戳, 返回 HH:MM:SS.mmm 或 None
+
+        传入 frame_idx 和 fps 时启用时间预测: 根据上一次成功读数和
+        帧间隔推算本帧应显示的时间, 再用缓存模板逐格核对; 核对通过
+        则完全跳过 OCR。
+
+        PaddleOCR 的耗时随像素数近似平方增长, 默认先按 resize_ratio
+        降采样识别, 全部策略失败时才回退原分辨率重试一次。
+        """
+        if self.resize_ratio != 1.0:
+            small = cv2.resize(img, None,
+                               fx=self.resize_ratio, fy=self.resize_ratio,
+                               interpolation=cv2.INTER_AREA)
+            time_str = self._extract_time_once(small, roi_type, frame_idx, fps)
+            if time_str is not None:
+                return time_str
+            return self._extract_time_once(img, roi_type, frame_idx, fps)
+        return self._extract_time_once(img, roi_type, frame_idx, fps)
+
+    def _extract_time_once(self, img, roi_type, frame_idx, fps):
+        """对单一分辨率的 ROI 跑预测/模板/级联三级识别"""
+        fast_strategy = self.best_strategy or 'original'
+
+        # 预测路径: 时间戳单调推进, 推算值核对通过即无需任何识别
+        if (frame_idx is not None and fps
+                and self._last_ms is not None and frame_idx > self._last_frame_idx):
+            predicted_ms = self._last_ms + round(
+                (frame_idx - self._last_frame_idx) * 1000 / fps)
+            predicted_str = self._format_ms(predicted_ms)
+            if self._verify_predicted(img, predicted_str, fast_strategy):
+                self._last_ms = predicted_ms
+                self._last_frame_idx = frame_idx
+                return predicted_str
+
+        # 快速路径: 模板齐全时跳过 PaddleOCR
+        time_str = self._match_templates(img, fast_strategy)
+        if time_str is not None and self.validate_time(time_str):
+            self._update_prediction_state(time_str, frame_idx)
+            return time_str
+
+        self._lazy_init()
+        h, w = img.shape[:2]
+        if self._rgb_buf is None or self._rgb_buf.shape[:2] != (h, w):
+            self._rgb_buf = np.empty((h, w, 3), dtype=np.uint8)
+            self._gray_buf = np.empty((h, w), dtype=np.uint8)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+        blank_streak = 0
+        for strategy in self._strategy_order:
+            if strategy == 'original':
+                rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+            else:
+                processed = self.preprocess_image(img, gray, strategy)
+                code = (cv2.COLOR_GRAY2RGB if processed.ndim == 2
+                        else cv2.COLOR_BGR2RGB)
+                if processed.shape[:2] == (h, w):
+                    # 复用同一块 RGB 缓冲, 消除逐策略的隐式分配
+                    rgb = cv2.cvtColor(processed, code, dst=self._rgb_buf)
+                else:
+                    # upscale 等会改变尺寸的策略照常分配
+                    rgb = cv2.cvtColor(processed, code)
+
+            self.strategy_stats[strategy]['attempts'] += 1
+            try:
+                result = self.ocr.ocr(rgb, cls=False)
+            except Exception as exc:
+                logger.debug("OCR 失败 (%s): %s", strategy, exc)
+                continue
+
+            texts = []
+            confidences = []
+            if result and result[0]:
+                for line in result[0]:
+                    texts.append(line[1][0])
+                    confidences.append(line[1][1])
+            if not texts:
+                # 连续两个基础策略都识别不到任何文本, 说明 ROI 本身
+                # 是空的, 继续级联只是浪费推理
+                if strategy in ('original', 'binary'):
+                    blank_streak += 1
+                    if blank_streak >= 2:
+                        break
+                continue
+
+            time_str = self._parse_time_from_texts(texts)
+            if time_str and self.validate_time(time_str):
+                avg_confidence = sum(confidences) / len(confidences)
+                self._record_success(strategy, avg_confidence)
+                self._cache_templates(img, time_str, strategy)
+                self._update_prediction_state(time_str, frame_idx)
+                return time_str
+
+        # 全部策略失败: 预测状态不再可信, 重置
+        self._last_ms = None
+        self._last_frame_idx = None
+        return None
+
+    def extract_time_batch(self, imgs, roi_types=None):
+        """批量识别多个 ROI 的时间戳, 返回与输入等长的结果列表
+
+        全部图像先用当前首选策略预处理并一次性交给 PaddleOCR,
+        摊薄每次调用的调度开销; 批量识别失败的个别图像再单独走
+        策略级联重试。
+        """
+        if not imgs:
+            return []
+        strategy = self.best_strategy or 'original'
+        if self.resize_ratio != 1.0:
+            imgs = [cv2.resize(img, None,
+                               fx=self.resize_ratio, fy=self.resize_ratio,
+                               interpolation=cv2.INTER_AREA) for img in imgs]
+        batch = []
+        for img in imgs:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            processed = self.preprocess_image(img, gray, strategy)
+            if processed.ndim == 2:
+                processed = cv2.cvtColor(processed, cv2.COLOR_GRAY2RGB)
+            else:
+                processed = cv2.cvtColor(processed, cv2.COLOR_BGR2RGB)
+            batch.append(processed)
+
+        results = [None] * len(imgs)
+        self._lazy_init()
+        try:
+            ocr_out = self.ocr.ocr(batch, cls=False)
+        except Exception as exc:
+            logger.debug("批量 OCR 失败: %s", exc)
+            ocr_out = [None] * len(imgs)
+
+        for i, per_img in enumerate(ocr_out):
+            texts = []
+            if per_img:
+                for line in per_img:
+                    texts.append(line[1][0])
+            if texts:
+                time_str = self._parse_time_from_texts(texts)
+                if time_str and self.validate_time(time_str):
+                    results[i] = time_str
+                    self._record_success(strategy)
+                    self._cache_templates(imgs[i], time_str, strategy)
+
+        # 失败的单独走级联重试 (imgs 已按 resize_ratio 缩放)
+        for i, time_str in enumerate(results):
+            if time_str is None:
+                roi_type = roi_types[i] if roi_types else 'app'
+                results[i] = self._extract_time_once(imgs[i], roi_type, None, None)
+        return results
+
+    def _update_prediction_state(self, time_str, frame_idx):
+        """成功读数后刷新预测基准"""
+        if frame_idx is None:
+            return
+        ms = self.parse_time_to_ms(time_str)
+        if ms is not None:
+            self._last_ms = ms
+            self._last_frame_idx = frame_idx
+
+    def _parse_time_from_texts(self, texts):
+        """从 OCR 文本列表中提取标准化的时间串"""
+        # 常见情形: OCR 直接给出唯一且格式标准的时间串, 不必跑
+        # 整个模式列表
+        if len(texts) == 1 and _STRICT_TIME_RE.fullmatch(texts[0]):
+            return texts[0]
+
+        all_text = ' '.join(texts)
+        all_text_nospace = all_text.replace(' ', '')
+        for pattern, name in _COMPILED_TIME_PATTERNS:
+            m = pattern.search(all_text_nospace)
+            if m:
+                groups = m.groups()
+                if len(groups) == 4:
+                    ms = groups[3].ljust(3, '0')
+                    return f"{groups[0]}:{groups[1]}:{groups[2]}.{ms}"
+                return f"{groups[0]}:{groups[1]}:{groups[2]}.000"
+
+        # 兜底: 纯数字串 (OCR 丢失了分隔符)
+        digits = ''.join(_DIGITS_RE.findall(all_text))
+        if 6 <= len(digits) <= 9:
+            digits = digits.ljust(9, '0')
+            return f"{digits[0:2]}:{digits[2:4]}:{digits[4:6]}.{digits[6:9]}"
+        return None
+
+    def _record_success(self, strategy, confidence=0.0):
+        """记录策略成功; 高置信度立即提升首选, 否则累计 3 次后提升"""
+        self.strategy_stats[strategy]['success'] += 1
+        if (strategy != self.best_strategy
+                and (confidence > 0.95
+                     or self.strategy_stats[strategy]['success'] >= 3)):
+            self.best_strategy = strategy
+            self._strategy_order = (strategy,) + tuple(
+                s for s in STRATEGIES if s != strategy)
+            logger.info("首选预处理策略切换为 %s", strategy)
+
+    # ------------------------------------------------------------------
+    # 时间串校验与换算
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def validate_time(time_str):
+        """校验 HH:MM:SS.mmm 各字段的取值范围"""
+        if _parse_time_ms_fast(time_str) >= 0:
+            return True
+        # 非标准长度(如毫秒不足 3 位)走慢速路径
+        try:
+            main_part, ms_part = time_str.split('.')
+            h, m, s = main_part.split(':')
+            return (0 <= int(h) <= 23 and 0 <= int(m) <= 59
+                    and 0 <= int(s) <= 59 and 0 <= int(ms_part) <= 999)
+        except (ValueError, AttributeError):
+            return False
+
+    @staticmethod
+    def parse_time_to_ms(time_str):
+        """把 HH:MM:SS.mmm 换算成当天毫秒数, 非法输入返回 None"""
+        ms = _parse_time_ms_fast(time_str)
+        if ms >= 0:
+            return ms
+        try:
+            main_part, ms_part = time_str.split('.')
+            h, m, s = main_part.split(':')
+            return ((int(h) * 3600 + int(m) * 60 + int(s)) * 1000 + int(ms_part))
+        except (ValueError, AttributeError):
+            return None
@@ -0,0 +1,561 @@
+"""视频延迟分析
+
+逐帧读取录屏视频, 从固定的 App 时间戳 ROI 和自动检测的相机实时
+时间水印 ROI 中分别 OCR 出时间, 差值即端到端画面延迟。
+"""
+import csv
+import logging
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from config import (
+    DEFAULT_FRAME_LIMIT,
+    DEFAULT_FRAME_STEP,
+    DEFAULT_RESIZE_RATIO,
+)
+from core.ocr_engine import OCREngine, TimestampOCR
+from core.roi_detector import ROIDetector
+
+logger = logging.getLogger(__name__)
+
+# 每次批量 OCR 的帧窗口大小 (每帧最多 2 个 ROI)
+BATCH_SIZE = 16
+
+
+try:
+    # OpenCV 编译了 CUDA 模块时, 裁剪预处理直接在显存里做
+    _HAS_CV_CUDA = cv2.cuda.getCudaEnabledDeviceCount() > 0
+except (AttributeError, cv2.error):
+    _HAS_CV_CUDA = False
+
+try:
+    # xxhash 比内建 hash 快且不受 PYTHONHASHSEED 影响, 没装就退回内建
+    import xxhash
+
+    def _frame_hash(img):
+        return xxhash.xxh64(img.tobytes()).intdigest()
+except ImportError:
+    def _frame_hash(img):
+        return hash(img.tobytes())
+
+
+def _analyze_one(args):
+    """子进程入口: 建一个独立的分析器跑一个视频 (需可 pickle)"""
+    analyzer = VideoAnalyzer(**args['init'])
+    return analyzer.analyze_video(args['video_path'], **args['run'])
+
+
+class VideoAnalyzer:
+    """从录屏视频中提取 App 时间与相机实时时间并计算延迟"""
+
+    def __init__(self, app_roi, use_gpu=False,
+                 frame_step=DEFAULT_FRAME_STEP,
+                 frame_limit=DEFAULT_FRAME_LIMIT,
+                 resize_ratio=DEFAULT_RESIZE_RATIO,
+                 backend=cv2.CAP_FFMPEG,
+                 real_roi_refresh_interval=30):
+        self.app_roi = app_roi
+        self.backend = backend
+        self.real_roi_refresh_interval = real_roi_refresh_interval
+        self.frame_step = frame_step
+        self.frame_limit = frame_limit
+        self.resize_ratio = resize_ratio
+        self.use_gpu = use_gpu
+        self.ocr_engine = OCREngine(use_gpu=use_gpu)
+        # App ROI 是固定版式时钟: 模板齐全后走数字模板匹配, 置信
+        # 不足回退完整 OCR, 成功的完整识别顺带补标定
+        self._timestamp_ocr = TimestampOCR(fallback=self.ocr_engine)
+        self.roi_detector = ROIDetector()
+        # 每线程一份的 resize 目标缓冲 (OCR 批次并发裁剪, 不能共享)
+        self._resize_local = threading.local()
+        # App ROI 固定不动, 裁剪边界按视频分辨率预先算好
+        self._app_roi_clamped = None
+        # 实时水印 ROI 的黏性缓存: 位置通常数秒不动, 不必帧帧重检
+        self._last_real_roi = None
+        self._last_real_template = None
+        self._real_roi_age = 0
+        # 按 ROI 记住上一次裁剪的哈希和识别结果: 时钟没走时 ROI 像素
+        # 一字不差, 几千次减法换掉一次完整的 DNN 前向
+        self._ocr_cache = {}
+        # (字符, 字号, 颜色) -> 预渲染字形, 标注文本用贴图代替 putText
+        self._glyphs = {}
+
+    # ------------------------------------------------------------------
+    # 单帧处理
+    # ------------------------------------------------------------------
+
+    def _crop_roi(self, frame, roi, reuse_buf=True, clamped=False):
+        """裁出 ROI, 转灰度并按比例缩放, 返回待识别图像或 None
+
+        OCR 引擎内部按灰度识别, 这里先转成单通道连续缓冲再缩放,
+        免得引擎对 BGR 切片再做一次内部拷贝转换, 带宽省 3 倍。
+        reuse_buf=False 时不复用目标缓冲; 批量路径的裁剪要在整窗
+        OCR 前一直存活, 不能被后续帧覆盖。clamped=True 表示 roi 已
+        预先夹取过边界 (固定的 App ROI 每视频只需夹一次)。
+        """
+        if clamped:
+            x1, y1, x2, y2 = roi
+        else:
+            h, w = frame.shape[:2]
+            x1, y1, x2, y2 = roi
+            x1 = max(0, x1)
+            y1 = max(0, y1)
+            x2 = min(w, x2)
+            y2 = min(h, y2)
+        if x2 <= x1 or y2 <= y1:
+            return None
+
+        roi_img = frame[y1:y2, x1:x2]
+        src_h, src_w = roi_img.shape[:2]
+        dst_w = max(1, int(src_w * self.resize_ratio))
+        dst_h = max(1, int(src_h * self.resize_ratio))
+
+        if self.use_gpu:
+            if _HAS_CV_CUDA:
+                # CUDA 路径: 上传一次 BGR 裁剪, 转灰度和缩放都在显存
+                # 里做, 只把小得多的灰度结果拷回主机, PCIe 流量最小
+                gpu = cv2.cuda_GpuMat()
+                gpu.upload(roi_img)
+                gpu = cv2.cuda.cvtColor(gpu, cv2.COLOR_BGR2GRAY)
+                if self.resize_ratio != 1.0:
+                    gpu = cv2.cuda.resize(gpu, (dst_w, dst_h),
+                                          interpolation=cv2.INTER_AREA)
+                return gpu.download()
+            # OpenCL 路径: T-API 把转灰度和缩放都交给 GPU
+            gray_u = cv2.cvtColor(cv2.UMat(roi_img), cv2.COLOR_BGR2GRAY)
+            if self.resize_ratio != 1.0:
+                gray_u = cv2.resize(gray_u, (dst_w, dst_h),
+                                    interpolation=cv2.INTER_AREA)
+            return gray_u.get()
+
+        if not reuse_buf:
+            gray = cv2.cvtColor(roi_img, cv2.COLOR_BGR2GRAY)
+            if self.resize_ratio != 1.0:
+                gray = cv2.resize(gray, (dst_w, dst_h),
+                                  interpolation=cv2.INTER_AREA)
+            return gray
+
+        # 复用按源尺寸缓存的灰度/缩放目标缓冲, 消除每帧的输出分配
+        bufs = getattr(self._resize_local, 'bufs', None)
+        if bufs is None:
+            bufs = self._resize_local.bufs = {}
+        gray_buf = bufs.get(('gray', src_h, src_w))
+        if gray_buf is None:
+            gray_buf = bufs[('gray', src_h, src_w)] = np.empty(
+                (src_h, src_w), dtype=np.uint8)
+        gray = cv2.cvtColor(roi_img, cv2.COLOR_BGR2GRAY, dst=gray_buf)
+        if self.resize_ratio == 1.0:
+            return gray
+        out_buf = bufs.get(('resize', src_h, src_w))
+        if out_buf is None:
+            out_buf = bufs[('resize', src_h, src_w)] = np.empty(
+                (dst_h, dst_w), dtype=np.uint8)
+        return cv2.resize(gray, (dst_w, dst_h), dst=out_buf,
+                          interpolation=cv2.INTER_AREA)
+
+    def _locate_real_roi(self, frame):
+        """带黏性缓存的实时水印 ROI 检测
+
+        水印位置通常数秒不动, 每 real_roi_refresh_interval 个处理帧
+        才完整重检一次; 其余帧只在上次 ROI 处做一次模板互检 (同尺寸
+        matchTemplate 只算一个分数), 跌破阈值立即重检。稳态下检测
+        成本基本从循环里消失。
+        """
+        roi = self._last_real_roi
+        if (roi is not None
+                and self._real_roi_age % self.real_roi_refresh_interval):
+            x1, y1, x2, y2 = roi
+            patch = frame[y1:y2, x1:x2]
+            tmpl = self._last_real_template
+            if (tmpl is not None and patch.shape == tmpl.shape
+                    and cv2.matchTemplate(
+                        patch, tmpl, cv2.TM_CCOEFF_NORMED).max() >= 0.8):
+                self._real_roi_age += 1
+                return roi
+
+        roi = self.roi_detector.detect_real_time_roi(frame)
+        self._last_real_roi = roi
+        self._real_roi_age = 1
+        if roi is not None:
+            x1, y1, x2, y2 = roi
+            self._last_real_template = frame[y1:y2, x1:x2].copy()
+        else:
+            self._last_real_template = None
+        return roi
+
+    def extract_time_from_roi(self, frame, roi):
+        """裁出 ROI 并 OCR, 返回时间串或 None
+
+        裁剪像素与上一次完全相同 (时钟没走) 时直接返回上次结果,
+        不再调用 OCR。App ROI 走 TimestampOCR 的数字模板快速路径,
+        模板未就绪或置信不足时其内部回退完整 OCR。
+        """
+        roi_img = self._crop_roi(frame, roi)
+        if roi_img is None:
+            return None
+        key = tuple(roi)
+        img_hash = _frame_hash(roi_img)
+        cached = self._ocr_cache.get(key)
+        if cached is not None and cached[0] == img_hash:
+            return cached[1]
+        if tuple(roi) == tuple(self.app_roi):
+            time_str = self._timestamp_ocr.extract(roi_img)
+        else:
+            texts = self.ocr_engine.extract_text(roi_img)
+            time_str = self.ocr_engine.parse_time(texts) if texts else None
+        self._ocr_cache[key] = (img_hash, time_str)
+        return time_str
+
+    def _glyph(self, ch, scale, color):
+        """取单字符的预渲染位图, 首次用到时栅格化一次并缓存"""
+        key = (ch, scale, color)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            (w, h), baseline = cv2.getTextSize(
+                ch, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+            canvas = np.zeros((h + baseline, max(1, w), 3), dtype=np.uint8)
+            cv2.putText(canvas, ch, (0, h),
+                        cv2.FONT_HERSHEY_SIMPLEX, scale, color, 2)
+            glyph = self._glyphs[key] = (canvas, canvas.any(axis=2), w, h)
+        return glyph
+
+    def _blit_text(self, frame, text, org, scale, color):
+        """用字形缓存把文本贴进帧里, 代替逐字重栅格化的 putText
+
+        标注文本几乎只有定宽的数字和固定前缀, 每个字形渲染一次
+        之后全程做掩码赋值, 比 cv2.putText 快一个量级。
+        """
+        x, y = org
+        frame_h, frame_w = frame.shape[:2]
+        for ch in text:
+            canvas, mask, w, h = self._glyph(ch, scale, color)
+            gh, gw = canvas.shape[:2]
+            top = y - h
+            if (ch != ' ' and top >= 0 and x >= 0
+                    and top + gh <= frame_h and x + gw <= frame_w):
+                region = frame[top:top + gh, x:x + gw]
+                region[mask] = canvas[mask]
+            x += w + 1
+
+    def _draw_annotations(self, frame, app_roi, real_roi,
+                          app_time, real_time, delay_ms):
+        """在帧上画出两个 ROI 和识别结果"""
+        x1, y1, x2, y2 = app_roi
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        self._blit_text(frame, f"T_app: {app_time or 'N/A'}",
+                        (x1, max(20, y1 - 10)), 0.7, (0, 255, 0))
+        if real_roi:
+            rx1, ry1, rx2, ry2 = real_roi
+            cv2.rectangle(frame, (rx1, ry1), (rx2, ry2), (0, 0, 255), 2)
+            self._blit_text(frame, f"T_real: {real_time or 'N/A'}",
+                            (rx1, max(20, ry1 - 10)), 0.7, (0, 0, 255))
+        delay_text = f"Delay: {delay_ms} ms" if delay_ms is not None else "Delay: N/A"
+        self._blit_text(frame, delay_text, (10, 30), 0.9, (0, 255, 255))
+        return frame
+
+    # ------------------------------------------------------------------
+    # 主流程
+    # ------------------------------------------------------------------
+
+    def _open_capture(self, video_path):
+        """显式用 FFmpeg 后端打开视频, GPU 模式下优先 NVDEC 硬解
+
+        默认后端常落在软件 H.264 解码上, 1080p 下解码能占掉大半
+        墙钟时间; 带 CUDA 时通过 FFmpeg 捕获选项把解码交给 cuvid。
+        打不开时回退默认后端, 行为不变。
+        """
+        if self.use_gpu:
+            os.environ.setdefault(
+                'OPENCV_FFMPEG_CAPTURE_OPTIONS',
+                'hwaccel;cuda|video_codec;h264_cuvid')
+        cap = cv2.VideoCapture(str(video_path), self.backend)
+        if not cap.isOpened():
+            cap = cv2.VideoCapture(str(video_path))
+        return cap
+
+    def _run_pipeline(self, cap):
+        """解码/OCR 两级流水线, 按帧号顺序产出识别结果
+
+        解码线程把 (frame_idx, frame, real_roi) 放进有界队列, OCR 在
+        单独的工作线程上串行执行 (Paddle 的推理 predictor 不是线程
+        安全的, 不能多线程共用一个 engine; 推理期间释放 GIL, 与解码
+        照样重叠); 主线程按提交顺序取回 future, 因此产出仍是有序的,
+        单调性校验可以照常在下游串行进行。
+        """
+        decode_q = queue.Queue(maxsize=8)
+
+        def _decode():
+            try:
+                for frame_idx in range(self.frame_limit + 1):
+                    # 跳过的帧只 grab 不 retrieve, 免去无谓的解码
+                    if not cap.grab():
+                        break
+                    if frame_idx % self.frame_step != 0:
+                        continue
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    real_roi = self._locate_real_roi(frame)
+                    decode_q.put((frame_idx, frame, real_roi))
+            finally:
+                decode_q.put(None)
+
+        def _ocr_batch(items):
+            # 把一窗帧的全部 ROI 裁剪后交给一次批量 OCR, 摊薄每次
+            # 推理调用的固定开销; 裁剪与上次哈希一致的 ROI 直接复用
+            # 上次识别结果, 整个跳过推理
+            crops = []
+            slots = []
+            for frame_idx, frame, real_roi in items:
+                # App ROI 固定, 用预夹取的矩形; real ROI 会移动, 照常夹取
+                app_img = self._crop_roi(frame, self._app_roi_clamped,
+                                         reuse_buf=False, clamped=True)
+                real_img = (self._crop_roi(frame, real_roi, reuse_buf=False)
+                            if real_roi else None)
+                entry = []
+                for key, img in (('app', app_img), ('real', real_img)):
+                    if img is None:
+                        entry.append(('none', None, None))
+                        continue
+                    img_hash = _frame_hash(img)
+                    cached = self._ocr_cache.get(key)
+                    if cached is not None and cached[0] == img_hash:
+                        entry.append(('hit', cached[1], img_hash))
+                        continue
+                    if key == 'app':
+                        # 固定版式时钟先试数字模板, 命中就不进 OCR 批
+                        time_str = self._timestamp_ocr.match(img)
+                        if time_str is not None:
+                            self._ocr_cache[key] = (img_hash, time_str)
+                            entry.append(('hit', time_str, img_hash))
+                            continue
+                    entry.append(('ocr', len(crops), img_hash))
+                    crops.append(img)
+                slots.append(entry)
+
+            texts_list = self.ocr_engine.extract_text_batch(crops)
+            out = []
+            for (frame_idx, frame, real_roi), entry in zip(items, slots):
+                times = []
+                for key, (kind, value, img_hash) in zip(('app', 'real'),
+                                                        entry):
+                    if kind == 'none':
+                        times.append(None)
+                    elif kind == 'hit':
+                        times.append(value)
+                    else:
+                        time_str = self.ocr_engine.parse_time(
+                            texts_list[value])
+                        self._ocr_cache[key] = (img_hash, time_str)
+                        if key == 'app' and time_str:
+                            # 成功的完整识别顺带为模板匹配补标定
+                            self._timestamp_ocr.calibrate(
+                                crops[value], time_str)
+                        times.append(time_str)
+                out.append((frame_idx, frame, real_roi, times[0], times[1]))
+            return out
+
+        # 单 OCR 工作线程: 推理必须串行 (共享 engine), 但预取 2 个
+        # 批次让它不会等解码
+        max_pending = 2
+        decoder = threading.Thread(target=_decode, daemon=True)
+        decoder.start()
+        pending = deque()
+        batch = []
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    item = decode_q.get()
+                    if item is None:
+                        exhausted = True
+                        if batch:
+                            pending.append(pool.submit(_ocr_batch, batch))
+                            batch = []
+                        break
+                    batch.append(item)
+                    if len(batch) >= BATCH_SIZE:
+                        pending.append(pool.submit(_ocr_batch, batch))
+                        batch = []
+                if not pending:
+                    break
+                yield from pending.popleft().result()
+        decoder.join()
+
+    def analyze_video(self, video_path, progress_callback=None,
+                      write_video_path=None, codec='mp4v',
+                      stream_csv_path=None):
+        """分析整段视频, 返回包含逐帧结果的字典
+
+        传入 write_video_path 时标注帧边分析边写入视频文件, 全程只
+        驻留一帧; 不传时保留旧行为, 把标注帧攒在内存里返回 (长视频
+        下每帧约 6 MB, 不建议)。传入 stream_csv_path 时逐帧结果边
+        产出边落盘, 同样的 I/O 总量但不在内存里攒全量行。
+        """
+        cap = self._open_capture(video_path)
+        if not cap.isOpened():
+            raise IOError(f"无法打开视频: {video_path}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # 固定的 App ROI 每个视频只夹取一次边界
+        frame_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        x1, y1, x2, y2 = self.app_roi
+        self._app_roi_clamped = (max(0, x1), max(0, y1),
+                                 min(frame_w, x2) if frame_w else x2,
+                                 min(frame_h, y2) if frame_h else y2)
+        # 每个视频重新走一遍完整的 ROI 检测, 识别缓存也清空
+        self._last_real_roi = None
+        self._last_real_template = None
+        self._real_roi_age = 0
+        self._ocr_cache = {}
+
+        results = []
+        annotated_frames = []
+        writer = None
+        csv_file = None
+        csv_writer = None
+        if stream_csv_path is not None:
+            csv_file = open(stream_csv_path, 'w', newline='',
+                            encoding='utf-8')
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(['frame_idx', 'video_time_s', 'app_time',
+                                 'real_time', 'delay_ms', 'status'])
+        last_app_ms = None
+
+        for frame_idx, frame, real_roi, app_time, real_time in \
+                self._run_pipeline(cap):
+            app_ms = self.ocr_engine.time_to_ms(app_time) if app_time else None
+            real_ms = self.ocr_engine.time_to_ms(real_time) if real_time else None
+
+            # 单调性校验: App 时间倒退说明 OCR 误读
+            app_time_wrong = False
+            if app_ms is not None and last_app_ms is not None and app_ms < last_app_ms:
+                app_time_wrong = True
+            if app_ms is not None and not app_time_wrong:
+                last_app_ms = app_ms
+
+            delay_ms = None
+            if app_ms is not None and real_ms is not None and not app_time_wrong:
+                delay_ms = real_ms - app_ms
+
+            row = {
+                'frame_idx': frame_idx,
+                'video_time_s': frame_idx / fps if fps else None,
+                'app_time': app_time,
+                'real_time': real_time,
+                'app_time_wrong': app_time_wrong,
+                'delay_ms': delay_ms,
+                'status': 'ok' if delay_ms is not None else 'fail',
+            }
+            results.append(row)
+            if csv_writer is not None:
+                csv_writer.writerow([
+                    row['frame_idx'],
+                    f"{row['video_time_s']:.3f}"
+                    if row['video_time_s'] is not None else "",
+                    row['app_time'] or "",
+                    row['real_time'] or "",
+                    row['delay_ms'] if row['delay_ms'] is not None else "",
+                    row['status'],
+                ])
+                if len(results) % 200 == 0:
+                    csv_file.flush()
+
+            # 解码出的帧此后不再他用, 直接在原帧上画, 省一次整帧拷贝
+            annotated = self._draw_annotations(
+                frame, self.app_roi, real_roi,
+                app_time, real_time, delay_ms)
+            if write_video_path is not None:
+                if writer is None:
+                    h, w = annotated.shape[:2]
+                    writer = cv2.VideoWriter(
+                        str(write_video_path),
+                        cv2.VideoWriter_fourcc(*codec),
+                        max(1.0, fps / self.frame_step), (w, h))
+                writer.write(annotated)
+            else:
+                annotated_frames.append(annotated)
+
+            if progress_callback:
+                progress_callback(frame_idx, total_frames)
+
+        cap.release()
+        if writer is not None:
+            writer.release()
+        if csv_file is not None:
+            csv_file.close()
+        return {
+            'results': results,
+            'annotated_frames': annotated_frames,
+            'annotated_video_path': write_video_path,
+            'csv_path': stream_csv_path,
+            'fps': fps,
+            'total_frames': total_frames,
+        }
+
+    @classmethod
+    def analyze_many(cls, video_paths, init_kwargs=None, run_kwargs=None,
+                     workers=None):
+        """多个视频用进程池并行分析, 按输入顺序返回结果字典列表
+
+        跨视频是天然的并行: 每个子进程各建一套 OCREngine, 绕开线程
+        池绕不开的 GIL, 吞吐随核数近线性增长。多进程抢同一块 GPU
+        只会互相拖慢, 子进程一律强制 CPU 推理。
+        """
+        init_kwargs = dict(init_kwargs or {})
+        init_kwargs['use_gpu'] = False
+        run_kwargs = dict(run_kwargs or {})
+        # 进度回调无法跨进程传递
+        run_kwargs.pop('progress_callback', None)
+        tasks = [{'init': init_kwargs, 'video_path': str(p),
+                  'run': run_kwargs} for p in video_paths]
+        workers = min(workers or os.cpu_count() or 2, max(1, len(tasks)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_analyze_one, tasks))
+
+    # ------------------------------------------------------------------
+    # 输出
+    # ------------------------------------------------------------------
+
+    def save_annotated_video(self, annotated_frames, output_path, fps):
+        """把标注帧序列写成视频
+
+        已不推荐: 优先给 analyze_video 传 write_video_path, 边分析边
+        落盘, 避免整段视频的帧都攒在内存里。
+        """
+        if not annotated_frames:
+            return None
+        h, w = annotated_frames[0].shape[:2]
+        out = cv2.VideoWriter(str(output_path),
+                              cv2.VideoWriter_fourcc(*'mp4v'),
+                              max(1.0, fps / self.frame_step), (w, h))
+        for frame in annotated_frames:
+            out.write(frame)
+        out.release()
+        return output_path
+
+    def save_csv_report(self, results, output_path):
+        """把逐帧结果写成 CSV 报告
+
+        用 pandas 的 C 路径一次写出, 省掉逐行逐字段的 Python 格式化;
+        None 统一落成空串, 与旧格式一致。
+        """
+        import pandas as pd
+
+        columns = ['frame_idx', 'video_time_s', 'app_time',
+                   'real_time', 'delay_ms', 'status']
+        df = pd.DataFrame(results, columns=columns)
+        df['video_time_s'] = df['video_time_s'].astype(float)
+        df.to_csv(output_path, index=False, encoding='utf-8',
+                  float_format='%.3f', na_rep='')
+        return Path(output_path)
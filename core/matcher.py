@@ -0,0 +1,155 @@
+"""网络日志与视频分析结果的时间对齐
+
+把视频分析得到的逐帧延迟和手机端/PC 端的 ping 日志按时间戳就近
+匹配, 用于判断画面延迟是否与网络抖动相关。
+"""
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 网络日志的列式 (SoA) 布局: 时间戳单独一条连续 float64 数组,
+# 二分匹配的热路径只摸这一列, 不再逐条哈希取字典键
+NetworkLog = namedtuple(
+    'NetworkLog', ['timestamps', 'ping_ms', 'status', 'target', 'datetime'])
+
+
+def _make_network_log(timestamps, ping_ms, status, target, datetime_col):
+    """按时间戳排序后组装 NetworkLog"""
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    order = np.argsort(timestamps, kind='stable')
+    return NetworkLog(
+        timestamps=timestamps[order],
+        ping_ms=np.asarray(ping_ms, dtype=np.float64)[order],
+        status=np.asarray(status, dtype=object)[order],
+        target=np.asarray(target, dtype=object)[order],
+        datetime=np.asarray(datetime_col, dtype=object)[order],
+    )
+
+
+def _as_network_log(log):
+    """兼容入口: 字典列表转 NetworkLog, 已是 NetworkLog 则原样返回"""
+    if isinstance(log, NetworkLog):
+        return log
+    rows = [item for item in log if item.get('timestamp') is not None]
+    return _make_network_log(
+        [r['timestamp'] for r in rows],
+        [r['ping_ms'] if r.get('ping_ms') is not None else np.nan
+         for r in rows],
+        [r.get('status', '') for r in rows],
+        [r.get('target', '') for r in rows],
+        [r.get('datetime', '') for r in rows],
+    )
+
+
+def load_network_log(filepath):
+    """读取 NetworkMonitor 保存的 ping 日志 CSV, 返回 NetworkLog"""
+    import pandas as pd
+
+    df = pd.read_csv(
+        filepath,
+        usecols=['timestamp', 'datetime', 'target', 'ping_ms', 'status'],
+        dtype={'timestamp': np.float64, 'ping_ms': np.float64},
+    ).dropna(subset=['timestamp'])
+    return _make_network_log(
+        df['timestamp'].values,
+        df['ping_ms'].values,
+        df['status'].fillna('').values,
+        df['target'].fillna('').values,
+        df['datetime'].fillna('').values,
+    )
+
+
+def load_video_analysis(filepath):
+    """读取 VideoAnalyzer 保存的逐帧分析 CSV, 返回字典列表"""
+    import pandas as pd
+
+    df = pd.read_csv(
+        filepath,
+        usecols=['frame_idx', 'video_time_s', 'delay_ms', 'status'],
+        dtype={'video_time_s': np.float64, 'delay_ms': np.float64},
+    ).dropna(subset=['frame_idx'])
+    df['frame_idx'] = df['frame_idx'].astype(np.int64)
+    df = df.rename(columns={'video_time_s': 'timestamp'})
+    df['status'] = df['status'].fillna('')
+    # NaN 还原成 None, 保持与下游 match() 约定的字典布局一致
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+class NetworkMatcher:
+    """按时间戳把视频帧与最近的 ping 采样配对"""
+
+    def __init__(self, tolerance=0.5):
+        # 允许的最大时间差(秒), 超出视为无匹配
+        self.tolerance = tolerance
+
+    def find_nearest_ping(self, network_data, timestamp):
+        """在网络日志中找时间上最接近 timestamp 的采样, 返回字典"""
+        log = _as_network_log(network_data)
+        if not len(log.timestamps):
+            return None
+        idx = self._nearest_indices(
+            log.timestamps, np.array([timestamp], dtype=np.float64))[0]
+        if idx < 0:
+            return None
+        ping = log.ping_ms[idx]
+        return {
+            'timestamp': float(log.timestamps[idx]),
+            'datetime': log.datetime[idx],
+            'target': log.target[idx],
+            'ping_ms': float(ping) if not np.isnan(ping) else None,
+            'status': log.status[idx],
+        }
+
+    def _nearest_indices(self, sorted_ts, video_ts):
+        """对每个视频时间戳二分出最近的日志下标, 超出容差记为 -1
+
+        日志时间戳在装载时已排好序, 全部帧共用同一次 searchsorted,
+        把逐帧线性扫描的 O(N·M) 降到 O(N log M)。
+        """
+        idx = np.searchsorted(sorted_ts, video_ts)
+        left = np.clip(idx - 1, 0, len(sorted_ts) - 1)
+        right = np.clip(idx, 0, len(sorted_ts) - 1)
+        take_left = (np.abs(sorted_ts[left] - video_ts)
+                     <= np.abs(sorted_ts[right] - video_ts))
+        best = np.where(take_left, left, right)
+        dist = np.abs(sorted_ts[best] - video_ts)
+        return np.where(dist <= self.tolerance, best, -1)
+
+    def match(self, video_data, phone_log, pc_log):
+        """为每个视频帧找到手机端/PC 端最近的 ping, 返回合并记录"""
+        frames = [f for f in video_data if f.get('timestamp') is not None]
+        if not frames:
+            return []
+        video_ts = np.fromiter((f['timestamp'] for f in frames),
+                               dtype=np.float64, count=len(frames))
+
+        phone = _as_network_log(phone_log)
+        pc = _as_network_log(pc_log)
+
+        def _lookup(log):
+            if not len(log.timestamps):
+                return np.full(len(frames), -1, dtype=np.intp)
+            return self._nearest_indices(log.timestamps, video_ts)
+
+        phone_idx = _lookup(phone)
+        pc_idx = _lookup(pc)
+
+        def _ping(log, i):
+            value = log.ping_ms[i]
+            return float(value) if not np.isnan(value) else None
+
+        matched = []
+        for frame, ts, pi, ci in zip(frames, video_ts, phone_idx, pc_idx):
+            matched.append({
+                'frame_idx': frame['frame_idx'],
+                'timestamp': float(ts),
+                'delay_ms': frame.get('delay_ms'),
+                'phone_ping_ms': _ping(phone, pi) if pi >= 0 else None,
+                'phone_status': phone.status[pi] if pi >= 0 else None,
+                'pc_ping_ms': _ping(pc, ci) if ci >= 0 else None,
+                'pc_status': pc.status[ci] if ci >= 0 else None,
+            })
+        return matched
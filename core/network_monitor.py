@@ -0,0 +1,582 @@
+"""网络延迟监控
+
+后台线程按固定间隔 ping 多个目标, 记录每次的 RTT 和状态, 用于与
+视频延迟分析结果做时间对齐。
+"""
+import asyncio
+import csv
+import logging
+import platform
+import re
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from enum import IntEnum
+from typing import Optional
+
+import numpy as np
+
+from config import DEFAULT_PING_TARGETS, HIGH_LATENCY_THRESHOLD
+
+try:
+    # 列式二进制日志, 比 CSV 小数倍且重载不走逐行解析
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    # 原生 ICMP socket, 免去每秒 fork/exec 一个 ping 进程
+    from icmplib import ping as icmp_ping
+    from icmplib import async_multiping
+    from icmplib.exceptions import ICMPLibError, SocketPermissionError
+except ImportError:
+    icmp_ping = None
+    async_multiping = None
+
+logger = logging.getLogger(__name__)
+
+# 域名解析结果的缓存时长(秒): ping 走缓存的 IP, RTT 里不再混入
+# DNS 往返, 也不再每秒打一次上游解析器
+_DNS_TTL = 900
+
+# ping 输出的 RTT 模式 (兼容中英文 Windows 和 Linux): 三种前缀合成
+# 一条正则, 每个样本只走一次扫描而不是顺序试三个模式
+_PING_RE = re.compile(
+    r'(?:时间|time|平均|Average)\s*[=<:]\s*(\d+(?:\.\d+)?)\s*ms',
+    re.IGNORECASE)
+
+
+class PingStatus(IntEnum):
+    """采样状态的整数编码, 直接存进 uint8 缓冲
+
+    热路径上状态全程以小整数存在 (单条 CMP 即可比较, numpy 归约可
+    向量化), 只在写 CSV / 对外展示时翻译回字符串。
+    """
+    OK = 0
+    TIMEOUT = 1
+    ERROR = 2
+    PARSE_ERROR = 3
+    DNS_ERROR = 4
+    SKIPPED = 5
+
+
+@dataclass(slots=True)
+class NetworkStatus:
+    """单次 ping 的采样结果"""
+    timestamp: float
+    target: str
+    ping_ms: Optional[float]
+    packet_loss: bool
+    status: str  # 'ok' / 'timeout' / 'error' / 'parse_error'
+
+
+class NetworkMonitor:
+    """多目标周期性 ping 监控
+
+    采样存成列式 (SoA) 的预分配 numpy 缓冲加写游标, 而不是
+    NetworkStatus 对象列表: 长时间录制内存省一个量级, 统计直接走
+    numpy 的向量化归约。旧的 self.data 接口以属性形式保留, 只在
+    访问时重建对象。
+    """
+
+    # 状态字符串与 PingStatus 编码的互查表 (由枚举派生)
+    _STATUS_NAMES = tuple(s.name.lower() for s in PingStatus)
+    _STATUS_CODES = {name: code for code, name in enumerate(_STATUS_NAMES)}
+
+    def __init__(self, targets=None, interval=1.0, timeout=2.0,
+                 high_latency_threshold=HIGH_LATENCY_THRESHOLD,
+                 capacity=None):
+        self.targets = list(targets) if targets else list(DEFAULT_PING_TARGETS)
+        self.interval = interval
+        self.timeout = timeout
+        self.high_latency_threshold = high_latency_threshold
+        # 预分配约一小时的量, 写满时翻倍
+        if capacity is None:
+            capacity = max(1024, int(3600 / interval) * len(self.targets))
+        self._capacity = capacity
+        self._ts = np.empty(capacity, np.float64)
+        self._ping = np.empty(capacity, np.float32)
+        self._target_idx = np.empty(capacity, np.uint8)
+        self._status_code = np.empty(capacity, np.uint8)
+        self._n = 0
+        self._targets_seen = list(self.targets)
+        self._target_index = {t: i for i, t in enumerate(self._targets_seen)}
+        self.running = False
+        self._thread = None
+        self._callback = None
+        # icmplib 权限不足时置位, 之后直接走子进程分支
+        self._icmp_unavailable = False
+        # target -> (ip, 解析时刻), 见 _DNS_TTL
+        self._resolved = {}
+        # 监控期间边采边写的 CSV (start 传入 live_csv_path 时启用)
+        self._csv_fp = None
+        self._csv_writer = None
+        # 常驻 fping 进程 (icmplib 缺席时的次优后端) 及其地址映射
+        self._fping = None
+        self._addr_target = {}
+
+    # ------------------------------------------------------------------
+    # 采样缓冲
+    # ------------------------------------------------------------------
+
+    def _grow(self):
+        self._capacity *= 2
+        for name in ('_ts', '_ping', '_target_idx', '_status_code'):
+            buf = getattr(self, name)
+            grown = np.empty(self._capacity, buf.dtype)
+            grown[:self._n] = buf[:self._n]
+            setattr(self, name, grown)
+
+    def _append(self, status):
+        """把一次采样写进列式缓冲"""
+        if self._n >= self._capacity:
+            self._grow()
+        idx = self._target_index.get(status.target)
+        if idx is None:
+            idx = self._target_index[status.target] = len(self._targets_seen)
+            self._targets_seen.append(status.target)
+        i = self._n
+        self._ts[i] = status.timestamp
+        self._ping[i] = (status.ping_ms
+                         if status.ping_ms is not None else np.nan)
+        self._target_idx[i] = idx
+        self._status_code[i] = self._STATUS_CODES.get(status.status, 2)
+        self._n = i + 1
+
+    def status_name(self, i):
+        """第 i 个采样的状态名"""
+        return PingStatus(int(self._status_code[i])).name.lower()
+
+    def target_name(self, i):
+        """第 i 个采样的目标名"""
+        return self._targets_seen[self._target_idx[i]]
+
+    @property
+    def data(self):
+        """兼容旧接口: 访问时才把缓冲重建成 NetworkStatus 列表"""
+        out = []
+        for i in range(self._n):
+            ping = float(self._ping[i])
+            code = int(self._status_code[i])
+            out.append(NetworkStatus(
+                timestamp=float(self._ts[i]),
+                target=self._targets_seen[self._target_idx[i]],
+                ping_ms=None if np.isnan(ping) else ping,
+                # 与 _ping_once/_probe_round 的约定一致: 除了收到回包
+                # 的 ok/parse_error, 其余状态都算丢包
+                packet_loss=code not in (PingStatus.OK,
+                                         PingStatus.PARSE_ERROR),
+                status=self._STATUS_NAMES[code],
+            ))
+        return out
+
+    # ------------------------------------------------------------------
+    # ping
+    # ------------------------------------------------------------------
+
+    def _resolve(self, target):
+        """解析目标主机名, 按 TTL 缓存; 失败返回 None"""
+        entry = self._resolved.get(target)
+        now = time.time()
+        if entry is not None and now - entry[1] < _DNS_TTL:
+            return entry[0]
+        try:
+            ip = socket.gethostbyname(target)
+        except OSError as exc:
+            logger.warning("解析 %s 失败: %s", target, exc)
+            return None
+        self._resolved[target] = (ip, now)
+        return ip
+
+    def _ping_once(self, target, timeout=None):
+        """执行一次 ping, 返回 NetworkStatus
+
+        优先用 icmplib 直接发 ICMP 包 (RTT 直接读数, 没有进程创建
+        和本地化文本解析的开销和抖动); 没装 icmplib 或没有 socket
+        权限时退回 ping 子进程。域名目标先走缓存解析, ping 直接打
+        IP, RTT 不含 DNS 往返。timeout 可按剩余时间预算收紧。
+        """
+        if timeout is None:
+            timeout = self.timeout
+        now = time.time()
+        addr = self._resolve(target)
+        if addr is None:
+            return NetworkStatus(now, target, None, True, 'dns_error')
+
+        if icmp_ping is not None and not self._icmp_unavailable:
+            try:
+                host = icmp_ping(addr, count=1, timeout=timeout,
+                                 privileged=False)
+            except SocketPermissionError:
+                # 无权限建 ICMP socket, 本次会话固定走子进程
+                self._icmp_unavailable = True
+            except ICMPLibError as exc:
+                logger.warning("ping %s 失败: %s", target, exc)
+                return NetworkStatus(now, target, None, True, 'error')
+            else:
+                if not host.is_alive:
+                    return NetworkStatus(now, target, None, True, 'timeout')
+                return NetworkStatus(now, target, host.avg_rtt, False, 'ok')
+
+        if platform.system() == "Windows":
+            cmd = ['ping', '-n', '1', '-w', str(int(timeout * 1000)), addr]
+        else:
+            # -n 跳过回复地址的反向 DNS, -q 只留格式确定的摘要行
+            cmd = ['ping', '-n', '-q', '-c', '1',
+                   '-W', str(max(1, int(timeout))), addr]
+
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True,
+                                  timeout=timeout + 1)
+        except subprocess.TimeoutExpired:
+            return NetworkStatus(now, target, None, True, 'timeout')
+        except OSError as exc:
+            logger.warning("ping %s 失败: %s", target, exc)
+            return NetworkStatus(now, target, None, True, 'error')
+
+        if proc.returncode != 0:
+            return NetworkStatus(now, target, None, True, 'timeout')
+
+        ping_ms = self._parse_ping_time(proc.stdout)
+        if ping_ms is None:
+            return NetworkStatus(now, target, None, False, 'parse_error')
+        return NetworkStatus(now, target, ping_ms, False, 'ok')
+
+    def _parse_ping_time(self, output):
+        """从 ping 输出中解析 RTT"""
+        # Linux/macOS -q 的摘要行格式固定:
+        # rtt min/avg/max/mdev = a/b/c/d ms — 纯字符串操作取 avg
+        for line in output.splitlines():
+            if 'min/avg/max' in line:
+                try:
+                    return float(line.rpartition('=')[2].split('/')[1])
+                except (IndexError, ValueError):
+                    break
+        # Windows (中英文) 输出仍走正则
+        m = _PING_RE.search(output)
+        if m:
+            return float(m.group(1))
+        return None
+
+    # ------------------------------------------------------------------
+    # 监控线程
+    # ------------------------------------------------------------------
+
+    async def _probe_all(self):
+        """并发探测全部目标, 返回按 self.targets 顺序的 NetworkStatus 列表
+
+        串行 ping 时某个目标超时会把后面目标的采样整体推迟, 打乱
+        interval 节拍; async_multiping 让一轮的耗时由最慢目标决定,
+        而不是所有目标的 RTT+超时之和。
+        """
+        now = time.time()
+        resolved = [(target, self._resolve(target))
+                    for target in self.targets]
+        addrs = [addr for _, addr in resolved if addr is not None]
+        hosts = iter(await async_multiping(
+            addrs, count=1, timeout=self.timeout,
+            privileged=False) if addrs else ())
+        statuses = []
+        for target, addr in resolved:
+            if addr is None:
+                statuses.append(NetworkStatus(now, target, None, True,
+                                              'dns_error'))
+                continue
+            host = next(hosts)
+            if not host.is_alive:
+                statuses.append(NetworkStatus(now, target, None, True,
+                                              'timeout'))
+            else:
+                statuses.append(NetworkStatus(now, target, host.avg_rtt,
+                                              False, 'ok'))
+        return statuses
+
+    def _probe_round(self, loop):
+        """跑一轮全目标探测; icmplib 不可用时退回逐目标子进程"""
+        if (async_multiping is not None and not self._icmp_unavailable
+                and loop is not None):
+            try:
+                return loop.run_until_complete(self._probe_all())
+            except SocketPermissionError:
+                self._icmp_unavailable = True
+            except ICMPLibError as exc:
+                logger.warning("批量 ping 失败: %s", exc)
+        # 串行子进程路径按截止时间分配预算: 一个慢目标吃光周期时,
+        # 剩余目标记成 skipped 而不是把整轮越拖越晚 —— 明确标记的
+        # 缺测比静默丢样好
+        deadline = time.monotonic() + self.interval
+        statuses = []
+        for target in self.targets:
+            if not self.running:
+                break
+            budget = deadline - time.monotonic()
+            if budget <= 0.1:
+                statuses.append(NetworkStatus(time.time(), target, None,
+                                              True, 'skipped'))
+                continue
+            statuses.append(
+                self._ping_once(target, timeout=min(self.timeout, budget)))
+        return statuses
+
+    def _start_fping(self):
+        """尝试拉起常驻 fping 进程, 成功返回 True
+
+        没有 icmplib 时, 每秒每目标 fork 一个 ping 仍然可免: fping
+        -l 单进程常驻, 按周期对全部目标发包并逐行吐结果, 整个录制
+        只有一次 fork。
+        """
+        if shutil.which('fping') is None:
+            return False
+        self._addr_target = {}
+        addrs = []
+        for target in self.targets:
+            addr = self._resolve(target)
+            if addr is not None:
+                self._addr_target[addr] = target
+                addrs.append(addr)
+        if not addrs:
+            return False
+        try:
+            self._fping = subprocess.Popen(
+                ['fping', '-l', '-p', str(int(self.interval * 1000)),
+                 '-t', str(int(self.timeout * 1000)), *addrs],
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                bufsize=1, text=True)
+        except OSError as exc:
+            logger.warning("启动 fping 失败: %s", exc)
+            return False
+        return True
+
+    def _parse_fping_line(self, line):
+        """解析 fping -l 的单行输出, 返回 NetworkStatus 或 None
+
+        成功行形如 '8.8.8.8 : [0], 84 bytes, 23.4 ms (...)',
+        超时行形如 '8.8.8.8 : [1], timed out ...'。
+        """
+        now = time.time()
+        addr, sep, rest = line.partition(' : ')
+        if not sep:
+            return None
+        target = self._addr_target.get(addr.strip(), addr.strip())
+        if ' ms' in rest:
+            try:
+                ping_ms = float(rest.split(' bytes, ')[1].split(' ms')[0])
+            except (IndexError, ValueError):
+                return NetworkStatus(now, target, None, False, 'parse_error')
+            return NetworkStatus(now, target, ping_ms, False, 'ok')
+        return NetworkStatus(now, target, None, True, 'timeout')
+
+    def _fping_loop(self):
+        """消费常驻 fping 的输出流"""
+        for line in self._fping.stdout:
+            if not self.running:
+                break
+            status = self._parse_fping_line(line.strip())
+            if status is None:
+                continue
+            self._append(status)
+            if self._csv_writer is not None:
+                self._csv_writer.writerow(self._csv_row(status))
+            if self._callback:
+                self._callback(status)
+
+    def _monitor_loop(self):
+        if self._fping is not None:
+            self._fping_loop()
+            return
+        loop = asyncio.new_event_loop() if async_multiping is not None else None
+        # 以单调时钟的绝对节拍调度: 不受 NTP 跳变影响, 单轮偶尔超时
+        # 也不会把相位误差累积到后续所有采样上
+        next_tick = time.monotonic()
+        try:
+            while self.running:
+                statuses = self._probe_round(loop)
+                # 整轮结果一次性并入, 减少锁/属性访问次数
+                for status in statuses:
+                    self._append(status)
+                if self._csv_writer is not None:
+                    for status in statuses:
+                        self._csv_writer.writerow(self._csv_row(status))
+                if self._callback:
+                    for status in statuses:
+                        self._callback(status)
+                next_tick += self.interval
+                sleep_time = next_tick - time.monotonic()
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+                else:
+                    # 落后超过一个周期时重新对齐, 避免补跑风暴
+                    next_tick = time.monotonic()
+        finally:
+            if loop is not None:
+                loop.close()
+
+    def start(self, callback=None, live_csv_path=None):
+        """启动后台监控线程
+
+        传入 live_csv_path 时采样边产出边落盘 (行缓冲), 长时间录制
+        不在内存外再攒一份待写数据, 进程意外退出日志也不丢,
+        stop() 后无需再调 save_log。
+        """
+        if self.running:
+            return
+        self._callback = callback
+        if live_csv_path is not None:
+            self._csv_fp = open(live_csv_path, 'w', newline='',
+                                encoding='utf-8', buffering=1)
+            self._csv_writer = csv.writer(self._csv_fp)
+            self._csv_writer.writerow(['timestamp', 'datetime', 'target',
+                                       'ping_ms', 'packet_loss', 'status'])
+        self.running = True
+        # 后端优先级: icmplib > 常驻 fping > 逐次 ping 子进程
+        if icmp_ping is None or self._icmp_unavailable:
+            self._start_fping()
+        self._thread = threading.Thread(target=self._monitor_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止监控并等待线程退出"""
+        self.running = False
+        if self._fping is not None:
+            self._fping.terminate()
+            try:
+                self._fping.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._fping.kill()
+            self._fping = None
+        if self._thread:
+            self._thread.join(timeout=self.timeout + self.interval + 1)
+            self._thread = None
+        if self._csv_fp is not None:
+            self._csv_fp.close()
+            self._csv_fp = None
+            self._csv_writer = None
+
+    # ------------------------------------------------------------------
+    # 统计与存取
+    # ------------------------------------------------------------------
+
+    def get_statistics(self):
+        """汇总当前采样的成功率和延迟分布 (numpy 向量化归约)"""
+        n = self._n
+        if not n:
+            return {}
+        codes = self._status_code[:n]
+        ping = self._ping[:n]
+        ok = codes == PingStatus.OK
+        ok_ping = ping[ok]
+        # 正常采样的 ping 都是有限值, NaN 只可能来自外部日志
+        if np.isnan(ok_ping).any():
+            ok_ping = ok_ping[~np.isnan(ok_ping)]
+        stats = {
+            'total_count': n,
+            'success_count': int(np.count_nonzero(ok)),
+            'timeout_count': int(np.count_nonzero(
+                codes == PingStatus.TIMEOUT)),
+            'high_latency_count': int(np.count_nonzero(
+                ok_ping > self.high_latency_threshold)),
+        }
+        if len(ok_ping):
+            stats['avg_ping_ms'] = float(ok_ping.mean())
+            stats['min_ping_ms'] = float(ok_ping.min())
+            stats['max_ping_ms'] = float(ok_ping.max())
+        return stats
+
+    @staticmethod
+    def _csv_row(d):
+        """NetworkStatus 对应的 CSV 行"""
+        return [
+            f"{d.timestamp:.3f}",
+            datetime.fromtimestamp(d.timestamp).strftime(
+                '%Y-%m-%d %H:%M:%S.%f')[:-3],
+            d.target,
+            d.ping_ms if d.ping_ms is not None else "",
+            int(d.packet_loss),
+            d.status,
+        ]
+
+    def save_log(self, filepath):
+        """把全部采样写成 CSV (实时落盘见 start 的 live_csv_path)"""
+        with open(filepath, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp', 'datetime', 'target',
+                             'ping_ms', 'packet_loss', 'status'])
+            writer.writerows(self._csv_row(d) for d in self.data)
+        return filepath
+
+    def save_log_parquet(self, filepath):
+        """把采样列直接写成 zstd 压缩的 Parquet
+
+        列式缓冲原样落盘, 没有逐行的 strftime 和浮点格式化; 文件比
+        CSV 小 5-10 倍, 重载是一次整块反序列化。
+        """
+        if pa is None:
+            raise RuntimeError("写 Parquet 日志需要安装 pyarrow")
+        n = self._n
+        table = pa.table({
+            'timestamp': self._ts[:n],
+            'target': [self._targets_seen[i] for i in self._target_idx[:n]],
+            'ping_ms': self._ping[:n],
+            'status': [self._STATUS_NAMES[c] for c in self._status_code[:n]],
+        })
+        pq.write_table(table, filepath, compression='zstd')
+        return filepath
+
+    def load_log_parquet(self, filepath):
+        """从 Parquet 恢复采样到缓冲, 返回各列的 numpy 数组字典"""
+        if pa is None:
+            raise RuntimeError("读 Parquet 日志需要安装 pyarrow")
+        table = pq.read_table(filepath)
+        ts = table['timestamp'].to_numpy()
+        ping = table['ping_ms'].to_numpy()
+        targets = table['target'].to_pylist()
+        status = table['status'].to_pylist()
+
+        n = len(ts)
+        self._targets_seen = []
+        self._target_index = {}
+        target_idx = np.empty(n, np.uint8)
+        for i, target in enumerate(targets):
+            j = self._target_index.get(target)
+            if j is None:
+                j = self._target_index[target] = len(self._targets_seen)
+                self._targets_seen.append(target)
+            target_idx[i] = j
+
+        self._ts = ts.astype(np.float64, copy=False)
+        self._ping = ping.astype(np.float32, copy=False)
+        self._target_idx = target_idx
+        self._status_code = np.fromiter(
+            (self._STATUS_CODES.get(s, 2) for s in status),
+            dtype=np.uint8, count=n)
+        self._n = n
+        self._capacity = max(1, n)
+        return {'timestamp': self._ts, 'ping_ms': self._ping,
+                'target_idx': self._target_idx,
+                'status_code': self._status_code}
+
+    def load_log(self, filepath):
+        """从 CSV 恢复采样记录到缓冲, 返回 NetworkStatus 列表"""
+        self._n = 0
+        loaded = []
+        with open(filepath, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                try:
+                    status = NetworkStatus(
+                        timestamp=float(row['timestamp']),
+                        target=row['target'],
+                        ping_ms=float(row['ping_ms']) if row['ping_ms'] else None,
+                        packet_loss=bool(int(row['packet_loss'])),
+                        status=row['status'],
+                    )
+                except (ValueError, KeyError):
+                    continue
+                self._append(status)
+                loaded.append(status)
+        return loaded
@@ -0,0 +1,49 @@
+"""实时时间戳 ROI 检测
+
+相机画面里叠加的"真实时间"水印位置会随分辨率/机型变化, 每帧用
+亮度阈值 + 轮廓筛选重新定位。
+"""
+import logging
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+
+class ROIDetector:
+    """定位相机画面中叠加的实时时间水印"""
+
+    def __init__(self, brightness_threshold=200,
+                 min_aspect=2.0, max_aspect=6.0,
+                 min_area_ratio=0.0005, max_area_ratio=0.05):
+        self.brightness_threshold = brightness_threshold
+        self.min_aspect = min_aspect
+        self.max_aspect = max_aspect
+        self.min_area_ratio = min_area_ratio
+        self.max_area_ratio = max_area_ratio
+
+    def detect_real_time_roi(self, frame):
+        """返回实时时间水印的 (x1, y1, x2, y2), 找不到返回 None"""
+        h, w = frame.shape[:2]
+        frame_area = h * w
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        _, binary = cv2.threshold(gray, self.brightness_threshold, 255,
+                                  cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL,
+                                       cv2.CHAIN_APPROX_SIMPLE)
+
+        best = None
+        best_area = 0
+        for contour in contours:
+            x, y, bw, bh = cv2.boundingRect(contour)
+            if bh == 0:
+                continue
+            aspect = bw / bh
+            area = bw * bh
+            if (self.min_aspect <= aspect <= self.max_aspect
+                    and self.min_area_ratio * frame_area <= area
+                    <= self.max_area_ratio * frame_area
+                    and area > best_area):
+                best = (x, y, x + bw, y + bh)
+                best_area = area
+        return best
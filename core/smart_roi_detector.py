@@ -0,0 +1,55 @@
+"""智能 ROI 检测
+
+在整帧中自动定位时间戳叠加层的候选区域, 用于在用户没有手动框选
+ROI 时给出初始值。基于亮度阈值 + 轮廓的长宽比/面积筛选。
+"""
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SmartROIDetector:
+    """自动定位时间戳叠加层候选 ROI"""
+
+    def __init__(self, min_aspect=2.0, max_aspect=8.0,
+                 min_area_ratio=0.001, max_area_ratio=0.2):
+        self.min_aspect = min_aspect
+        self.max_aspect = max_aspect
+        self.min_area_ratio = min_area_ratio
+        self.max_area_ratio = max_area_ratio
+
+    def detect(self, frame):
+        """返回候选 ROI 列表 [(x1, y1, x2, y2), ...], 按面积降序"""
+        h, w = frame.shape[:2]
+        frame_area = h * w
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        _, binary = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY)
+        kernel = np.ones((3, 15), np.uint8)
+        merged = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        contours, _ = cv2.findContours(merged, cv2.RETR_EXTERNAL,
+                                       cv2.CHAIN_APPROX_SIMPLE)
+
+        candidates = []
+        for contour in contours:
+            x, y, bw, bh = cv2.boundingRect(contour)
+            if bh == 0:
+                continue
+            aspect = bw / bh
+            area = bw * bh
+            if (self.min_aspect <= aspect <= self.max_aspect
+                    and self.min_area_ratio * frame_area <= area
+                    <= self.max_area_ratio * frame_area):
+                candidates.append((x, y, x + bw, y + bh))
+
+        candidates.sort(key=lambda r: (r[2] - r[0]) * (r[3] - r[1]), reverse=True)
+        return candidates
+
+    def detect_best(self, frame):
+        """返回最可能的时间戳 ROI, 找不到返回 None"""
+        candidates = self.detect(frame)
+        if candidates:
+            return candidates[0]
+        return None
@@ -0,0 +1,687 @@
+"""视频延迟分析工具 GUI 入口
+
+PyQt5 单窗口应用: 选择录屏视频 -> 后台线程 OCR 两处时间戳叠加层
+(App 内时间 + 摄像头水印时间) -> 计算逐帧延迟, 输出 CSV 与 HTML
+报告。分析管线在 AnalysisWorker 里自带一份精简实现 (core 重构前的
+原始版本), 打包入口见 build_exe.py。
+"""
+import html
+import json
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter, QPen, QPixmap
+from PyQt5.QtWidgets import (
+    QApplication, QCheckBox, QDialog, QDialogButtonBox, QFileDialog,
+    QHBoxLayout, QLabel, QMainWindow, QMessageBox, QProgressBar,
+    QPushButton, QSlider, QVBoxLayout, QWidget,
+)
+
+import config
+
+try:
+    # numba 可选: 把灰度+反相阈值融合成一次遍历的并行内核
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+try:
+    # PyAV 可选: 多线程 FFmpeg 解码且释放 GIL, 顺序读比 OpenCV 的
+    # Python 封装快约 2 倍
+    import av
+except ImportError:
+    av = None
+
+try:
+    # xxhash 可选 (SSE4.2 加速, ~10GB/s), 没有就用内建 hash
+    import xxhash
+
+    def _roi_hash(img):
+        # 对全分辨率像素做精确哈希 (同 core/analyzer._frame_hash):
+        # 毫秒级时间戳只差几个像素, 降采样哈希会把不同时刻撞成同值
+        return xxhash.xxh64(img.tobytes()).intdigest()
+except ImportError:
+    def _roi_hash(img):
+        return hash(img.tobytes())
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _parse_hms_ms(b):
+        """定宽 "HH:MM:SS.mmm" 的 12 字节无分支解析
+
+        按固定偏移减 '0' 再乘加, 单次 ~ns 级; 字节位置的合法性由
+        调用方保证 (来源是定宽正则的匹配结果)。
+        """
+        hours = (b[0] - 48) * 10 + (b[1] - 48)
+        minutes = (b[3] - 48) * 10 + (b[4] - 48)
+        seconds = (b[6] - 48) * 10 + (b[7] - 48)
+        ms = (b[9] - 48) * 100 + (b[10] - 48) * 10 + (b[11] - 48)
+        return (hours * 3600 + minutes * 60 + seconds) * 1000 + ms
+
+    @njit(parallel=True, cache=True)
+    def _bgr_to_binary_inv(frame, thr):
+        """BGR -> 反相二值图, 单次读写, 按行并行
+
+        灰度用三通道均值近似 (对阈值 30 的暗背景检测足够),
+        相比 cvtColor+threshold 两次全图遍历省一半内存流量。
+        """
+        h, w = frame.shape[:2]
+        out = np.empty((h, w), np.uint8)
+        for y in prange(h):
+            for x in range(w):
+                g = (np.int32(frame[y, x, 0]) + frame[y, x, 1]
+                     + frame[y, x, 2]) // 3
+                out[y, x] = 255 if g < thr else 0
+        return out
+else:
+    _parse_hms_ms = None
+    _bgr_to_binary_inv = None
+
+
+class AnalysisWorker(QThread):
+    """后台分析线程: 解码、OCR、统计与报告都在这里完成"""
+
+    progress = pyqtSignal(int, int)
+    finished_ok = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    # 热路径的模式在类加载时编译一次; 杂字符清理用 str.translate
+    # 的 C 级单次遍历取代逐字符的 Python 集合判断
+    _TIME_RE = re.compile(r"\d{2}:\d{2}:\d{2}[.:]\d{1,3}")
+    _PARSE_RE = re.compile(r"(\d{2}):(\d{2}):(\d{2})(?:[.:](\d{1,3}))?")
+    _KEEP_TABLE = str.maketrans("", "", "".join(
+        chr(c) for c in range(256) if chr(c) not in "0123456789:."))
+
+    def __init__(self, video_path, app_roi, use_gpu=False,
+                 frame_step=config.DEFAULT_FRAME_STEP,
+                 frame_limit=config.DEFAULT_FRAME_LIMIT,
+                 resize_ratio=config.DEFAULT_RESIZE_RATIO,
+                 save_debug_frames=False, parent=None):
+        super().__init__(parent)
+        self.video_path = video_path
+        self.app_roi = tuple(app_roi)
+        self.use_gpu = use_gpu
+        self.frame_step = frame_step
+        self.frame_limit = frame_limit
+        self.resize_ratio = resize_ratio
+        self.save_debug_frames = save_debug_frames
+        self.ocr = None
+        self._last_roi_hash = None
+        self._last_roi_text = None
+
+    # ------------------------------------------------------------------
+    # 线程入口
+    # ------------------------------------------------------------------
+
+    def run(self):
+        try:
+            # 共享单例: 模型只在进程内加载一次, 重复分析免去数秒预热
+            from core._ocr_singleton import get_engine
+            self.ocr = get_engine(self.use_gpu)
+            summary = self.analyze_video()
+        except Exception as exc:  # 后台线程的异常必须转成信号带回 UI
+            self.failed.emit(str(exc))
+            return
+        self.finished_ok.emit(summary)
+
+    # ------------------------------------------------------------------
+    # 视频分析
+    # ------------------------------------------------------------------
+
+    def detect_real_time_roi(self, frame):
+        """在画面中定位摄像头水印时间条, 返回 (x1,y1,x2,y2) 或 None
+
+        水印是深色背景上的亮字, 反相二值化后找外接矩形, 按面积和
+        宽高比挑出最像时间条的轮廓。
+        """
+        h, w = frame.shape[:2]
+        if _bgr_to_binary_inv is not None:
+            binary = _bgr_to_binary_inv(frame, 30)
+        else:
+            # 没有 numba 时退到 OpenCV T-API: UMat 让 cvtColor/
+            # threshold 走 OpenCL (无设备时也有 SIMD 并行实现)
+            umat = cv2.UMat(frame)
+            gray = cv2.cvtColor(umat, cv2.COLOR_BGR2GRAY)
+            _, th = cv2.threshold(gray, 30, 255, cv2.THRESH_BINARY_INV)
+            binary = th.get()
+        contours, _ = cv2.findContours(
+            binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        # 面积/宽高比筛选向量化: 逐轮廓的解释循环换成三次掩码运算
+        rects = np.array([cv2.boundingRect(c) for c in contours],
+                         dtype=np.int32)
+        areas = rects[:, 2] * rects[:, 3]
+        ratios = rects[:, 2] / (rects[:, 3] + 1e-6)
+        valid = ((areas >= 0.05 * w * h) & (areas <= 0.5 * w * h)
+                 & (ratios >= 2.0) & (ratios <= 6.0))
+        if not valid.any():
+            return None
+        idx = np.where(valid)[0][np.argmax(areas[valid])]
+        x, y, bw, bh = rects[idx]
+        return (int(x), int(y), int(x + bw), int(y + bh))
+
+    def _time_from_texts(self, texts):
+        """从一组 OCR 文本里抠出 HH:MM:SS.mmm 时间串"""
+        for txt in texts:
+            m = self._TIME_RE.search(txt.translate(self._KEEP_TABLE))
+            if m:
+                return m.group(0)
+        return None
+
+    def extract_time_from_roi(self, img):
+        """单张 ROI 图像的 OCR + 时间解析 (预览/校验用的单发路径)
+
+        相邻调用的 ROI 像素往往一模一样, 全像素哈希相同时直接
+        复用上次结果, 省掉一次模型前向。
+        """
+        key = _roi_hash(img)
+        if key == self._last_roi_hash:
+            return self._last_roi_text
+        result = self.ocr.ocr(img, cls=False)
+        texts = []
+        if result and result[0]:
+            for line in result[0]:
+                texts.append(line[1][0])
+        text = self._time_from_texts(texts)
+        self._last_roi_hash = key
+        self._last_roi_text = text
+        return text
+
+    @staticmethod
+    def _norm_time(time_str):
+        """统一成 HH:MM:SS.mmm, 供批量 to_datetime 按固定格式解析"""
+        if time_str is None:
+            return None
+        if len(time_str) == 8:
+            return time_str + ".000"
+        return time_str[:8] + "." + time_str[9:].ljust(3, "0")
+
+    @staticmethod
+    def _dedup_slot(crops, hash_to_slot, crop):
+        """按全像素精确哈希去重: 画面相同的 ROI 只进一次 OCR 批"""
+        key = _roi_hash(crop)
+        slot = hash_to_slot.get(key)
+        if slot is None:
+            slot = len(crops)
+            crops.append(crop)
+            hash_to_slot[key] = slot
+        return slot
+
+    @classmethod
+    def parse_time_to_ms(cls, time_str):
+        """HH:MM:SS.mmm -> 当天毫秒数, 非法输入返回 None
+
+        一次编译好的正则同时完成校验和分组提取, 取代 partition/
+        split 的多次中间字符串分配。
+        """
+        if not time_str:
+            return None
+        # 规整的 12 字符串走编译后的定宽快路径, 异形串才进正则
+        if (_parse_hms_ms is not None and len(time_str) == 12
+                and time_str[2] == ":" and time_str[5] == ":"
+                and time_str[8] == "."):
+            try:
+                return int(_parse_hms_ms(time_str.encode("ascii")))
+            except UnicodeEncodeError:
+                pass
+        m = cls._PARSE_RE.match(time_str)
+        if m is None:
+            return None
+        hours = int(m.group(1))
+        minutes = int(m.group(2))
+        seconds = int(m.group(3))
+        ms = m.group(4)
+        ms_val = int(ms.ljust(3, "0")[:3]) if ms else 0
+        return (hours * 3600 + minutes * 60 + seconds) * 1000 + ms_val
+
+    def _iter_frames(self):
+        """按 frame_step 采样产出 (帧号, BGR 图像, fps), 优先走 PyAV
+
+        PyAV 让 FFmpeg 按 thread_type='AUTO' 多线程解码并在解码时
+        释放 GIL; 采样仍按固定 frame_step, 所以不跳非关键帧 (那会
+        打乱等距采样)。步进判断在这里做: 被跳过的帧不做 bgr24 转换
+        (PyAV 路径) / 只 grab 不 retrieve (cv2 回退路径), 默认
+        frame_step=5 时省掉 ~80% 的整帧拷贝。
+        """
+        step = self.frame_step
+        if av is not None:
+            container = av.open(str(self.video_path))
+            stream = container.streams.video[0]
+            stream.thread_type = "AUTO"
+            fps = float(stream.average_rate or 30.0)
+            try:
+                for idx, frame in enumerate(container.decode(stream)):
+                    if idx % step == 0:
+                        yield idx, frame.to_ndarray(format="bgr24"), fps
+            finally:
+                container.close()
+            return
+        cap = cv2.VideoCapture(str(self.video_path))
+        if not cap.isOpened():
+            raise RuntimeError(f"无法打开视频: {self.video_path}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        try:
+            idx = 0
+            while True:
+                if idx % step == 0:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    yield idx, frame, fps
+                elif not cap.grab():
+                    break
+                idx += 1
+        finally:
+            cap.release()
+
+    def analyze_video(self):
+        """主分析流程, 返回包含各输出路径的摘要字典"""
+        config.ensure_dirs()
+        debug_dir = config.DEBUG_FRAME_DIR
+
+        # 逐帧数据按列存 (SoA): 采集阶段只记帧号, 其余列在 OCR 和
+        # 延迟计算后整列生成, 不再维护 list[dict]
+        frame_idxs = []
+        io_pool = ThreadPoolExecutor(max_workers=2)
+        # 注释帧即产即写: 不再把每帧 ~6MB 的 BGR 缓冲攒在内存里等
+        # 循环结束后二次遍历, 写完一帧就可以丢掉一帧
+        video_out_path = config.OUTPUT_DIR / "annotated.mp4"
+        out = None
+        # 批量 OCR 缓冲: 采集阶段只裁剪不推理, 最后一次调用跑完全部
+        # ROI, 把每帧两次的模型调度固定开销摊薄成一次
+        crops = []
+        crop_slots = []  # 每帧 (app 裁剪下标, real 裁剪下标或 None)
+        hash_to_slot = {}  # 全像素哈希 -> 批内下标, 重复画面共享结果
+        processed = 0
+        fps = 30.0
+        for frame_idx, frame, fps in self._iter_frames():
+            if processed >= self.frame_limit:
+                break
+
+            # 整帧只缩放一次: 水印检测和两处 OCR 裁剪共用同一张缩
+            # 小图, 阈值/轮廓的像素量降为 1/4, 也省掉 OCR 前对每个
+            # ROI 的单独 resize
+            ratio = self.resize_ratio
+            small = cv2.resize(frame, None, fx=ratio, fy=ratio,
+                               interpolation=cv2.INTER_AREA)
+
+            x1, y1, x2, y2 = self.app_roi
+            sx1, sy1, sx2, sy2 = (int(v * ratio) for v in self.app_roi)
+            app_slot = self._dedup_slot(
+                crops, hash_to_slot, small[sy1:sy2, sx1:sx2].copy())
+
+            real_roi = self.detect_real_time_roi(small)
+            real_slot = None
+            if real_roi is not None:
+                srx1, sry1, srx2, sry2 = real_roi
+                real_slot = self._dedup_slot(
+                    crops, hash_to_slot,
+                    small[sry1:sry2, srx1:srx2].copy())
+                # 检测结果在缩小图坐标系, 放大回原图用于标注
+                inv = 1.0 / ratio
+                rx1, ry1, rx2, ry2 = (int(v * inv) for v in real_roi)
+            crop_slots.append((app_slot, real_slot))
+
+            annotated = frame.copy()
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            if real_roi is not None:
+                cv2.rectangle(annotated, (rx1, ry1), (rx2, ry2),
+                              (0, 0, 255), 2)
+            if out is None:
+                h, w = annotated.shape[:2]
+                out = cv2.VideoWriter(
+                    str(video_out_path), cv2.VideoWriter_fourcc(*"mp4v"),
+                    fps / self.frame_step, (w, h))
+            out.write(annotated)
+            if self.save_debug_frames:
+                # JPEG 走 libjpeg-turbo 的 SIMD DCT, 比 PNG 的 Deflate
+                # 快 5-10 倍; 写盘丢给后台线程, 与下一帧的处理重叠
+                debug_path = debug_dir / f"frame_{frame_idx:06d}.jpg"
+                io_pool.submit(
+                    cv2.imwrite, str(debug_path), annotated,
+                    [cv2.IMWRITE_JPEG_QUALITY, 85])
+
+            frame_idxs.append(frame_idx)
+            processed += 1
+            self.progress.emit(processed, self.frame_limit)
+        if out is not None:
+            out.release()
+        # 等调试帧全部落盘再返回
+        io_pool.shutdown(wait=True)
+
+        # 一次批量推理识别所有 ROI (PaddleOCR 接受图像列表输入)
+        texts_per_crop = self._ocr_batch(crops)
+
+        app_times = []
+        real_times = []
+        app_strs = []
+        real_strs = []
+        for app_slot, real_slot in crop_slots:
+            app_time = self._time_from_texts(texts_per_crop[app_slot])
+            real_time = None
+            if real_slot is not None:
+                real_time = self._time_from_texts(texts_per_crop[real_slot])
+            app_times.append(app_time)
+            real_times.append(real_time)
+            app_strs.append(self._norm_time(app_time))
+            real_strs.append(self._norm_time(real_time))
+
+        # 时间串整列交给 pandas 的 C 解析器, 相减直接得到毫秒数组,
+        # 不再每帧调两次 Python 解析
+        import pandas as pd
+
+        app_series = pd.to_datetime(
+            app_strs, format="%H:%M:%S.%f", errors="coerce")
+        real_series = pd.to_datetime(
+            real_strs, format="%H:%M:%S.%f", errors="coerce")
+        # 延迟约定与 core/analyzer.py 一致: 以相机水印 (real) 为基准,
+        # delay = real - app, App 画面滞后于真实时间时为正
+        delays_ms = pd.Series(
+            (real_series - app_series) / pd.Timedelta(milliseconds=1))
+        delay_col = delays_ms.round().astype("Int64")  # NaN -> <NA>
+
+        frame_arr = np.asarray(frame_idxs, dtype=np.int32)
+        df = pd.DataFrame({
+            "frame_idx": frame_arr,
+            "video_time_s": frame_arr / fps,
+            "app_time": app_times,
+            "real_time": real_times,
+            "delay_ms": delay_col,
+            "status": np.where(delay_col.notna(), "ok", "fail"),
+        })
+
+        csv_path = config.OUTPUT_DIR / "延迟分析.csv"
+        df.to_csv(csv_path, index=False, encoding="utf-8-sig",
+                  float_format="%.3f")
+
+        html_path = config.OUTPUT_DIR / "延迟分析报告.html"
+        self.generate_html_report(df, html_path)
+
+        return {
+            "results": df,
+            "csv_path": str(csv_path),
+            "html_path": str(html_path),
+            "video_path": str(video_out_path) if out is not None else None,
+        }
+
+    def _ocr_batch(self, crops):
+        """批量识别全部裁剪图, 返回逐图文本列表"""
+        if not crops:
+            return []
+        result = self.ocr.ocr(crops, cls=False)
+        texts_per_crop = []
+        for img_result in result:
+            texts = []
+            if img_result:
+                for line in img_result:
+                    texts.append(line[1][0])
+            texts_per_crop.append(texts)
+        return texts_per_crop
+
+    # ------------------------------------------------------------------
+    # 报告
+    # ------------------------------------------------------------------
+
+    def generate_delay_curve(self, df):
+        """提取延迟曲线需要的两列数据"""
+        valid = df["delay_ms"].notna()
+        return {
+            "frames": df.loc[valid, "frame_idx"].tolist(),
+            "delays": df.loc[valid, "delay_ms"].tolist(),
+        }
+
+    # 明细行模板: format_map 一次替换, 不再逐行 f-string 拼接大字符串
+    _ROW_TMPL = ("<tr><td>{frame_idx}</td><td>{video_time_s:.3f}</td>"
+                 "<td>{app_time}</td><td>{real_time}</td>"
+                 "<td>{delay_ms}</td><td>{status}</td></tr>\n")
+
+    def generate_html_report(self, df, html_path):
+        """渲染简版 HTML 报告 (统计 + 曲线 + 明细表), 流式写盘"""
+        # 统计和曲线直接在 DataFrame 的列上做 numpy 归约
+        delay_arr = df["delay_ms"].to_numpy(dtype=np.float64,
+                                            na_value=np.nan)
+        valid = ~np.isnan(delay_arr)
+        valid_count = int(valid.sum())
+        if valid_count:
+            avg_delay = float(np.nanmean(delay_arr))
+            min_delay = float(np.nanmin(delay_arr))
+            max_delay = float(np.nanmax(delay_arr))
+        else:
+            avg_delay = min_delay = max_delay = 0
+        curve = {
+            "frames": df["frame_idx"].to_numpy()[valid].tolist(),
+            "delays": delay_arr[valid].astype(np.int64).tolist(),
+        }
+
+        head = f"""<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="UTF-8">
+<title>视频延迟分析报告</title>
+<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+</head><body>
+<h1>视频延迟分析报告</h1>
+<p>总帧数: {len(df)} | 有效帧数: {valid_count}
+ | 平均延迟: {avg_delay:.1f} ms | 最小: {min_delay:.1f} ms
+ | 最大: {max_delay:.1f} ms</p>
+<canvas id="delayChart" height="80"></canvas>
+<table border="1" cellspacing="0">
+<tr><th>帧号</th><th>视频时间(s)</th><th>App 时间</th>
+<th>实时时间</th><th>延迟(ms)</th><th>状态</th></tr>
+"""
+        tail = f"""</table>
+<script>
+const curve = {json.dumps(curve)};
+new Chart(document.getElementById('delayChart').getContext('2d'), {{
+    type: 'line',
+    data: {{ labels: curve.frames,
+            datasets: [{{ label: '延迟 (ms)', data: curve.delays,
+                         borderColor: '#0097e6', pointRadius: 2 }}] }},
+    options: {{ animation: false }}
+}});
+</script>
+</body></html>
+"""
+        # 逐行写入 1MB 缓冲文件对象, 峰值内存与帧数无关;
+        # OCR 文本来自外部图像, 过一遍 html.escape。列先 tolist()
+        # 再 zip, 避免逐行走 DataFrame 的取值路径
+        row_tmpl = self._ROW_TMPL
+        columns = zip(df["frame_idx"].tolist(),
+                      df["video_time_s"].tolist(),
+                      df["app_time"].tolist(),
+                      df["real_time"].tolist(),
+                      delay_arr,
+                      df["status"].tolist())
+        with open(html_path, "w", encoding="utf-8",
+                  buffering=1 << 20) as f:
+            f.write(head)
+            for fi, vt, app_t, real_t, delay, status in columns:
+                f.write(row_tmpl.format_map({
+                    "frame_idx": fi,
+                    "video_time_s": vt,
+                    "app_time": html.escape(app_t or "N/A"),
+                    "real_time": html.escape(real_t or "N/A"),
+                    "delay_ms": int(delay) if delay == delay else "N/A",
+                    "status": status,
+                }))
+            f.write(tail)
+        return html_path
+
+
+class ROIAdjustDialog(QDialog):
+    """拖动滑块微调 App 时间戳 ROI, 预览实时刷新"""
+
+    def __init__(self, video_path, roi, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("调整 App 时间 ROI")
+        cap = cv2.VideoCapture(str(video_path))
+        ret, frame = cap.read()
+        cap.release()
+        if not ret:
+            raise RuntimeError(f"无法读取视频首帧: {video_path}")
+        self.frame = frame
+        self.h, self.w = frame.shape[:2]
+
+        # BGR->RGB 转换和缩放只做一次; 拖滑块时只需在底图副本上
+        # 画一个矩形, 省掉每个 tick 整帧 copy + cvtColor + 重采样
+        rgb = np.ascontiguousarray(frame[:, :, ::-1])
+        image = QImage(rgb.data, self.w, self.h, rgb.strides[0],
+                       QImage.Format_RGB888)
+        base = QPixmap.fromImage(image)
+        if self.w > 1000:
+            base = base.scaledToWidth(1000, Qt.SmoothTransformation)
+        self._base_pix = base
+        self._scale = base.width() / self.w
+
+        layout = QVBoxLayout(self)
+        self.img_label = QLabel()
+        layout.addWidget(self.img_label)
+
+        self.sliders = {}
+        maxes = (self.w, self.h, self.w, self.h)
+        for name, value, maximum in zip(
+                ("x1", "y1", "x2", "y2"), roi, maxes):
+            row = QHBoxLayout()
+            row.addWidget(QLabel(name))
+            slider = QSlider(Qt.Horizontal)
+            slider.setRange(0, maximum)
+            slider.setValue(value)
+            slider.valueChanged.connect(self.on_slider_changed)
+            row.addWidget(slider)
+            self.sliders[name] = slider
+            layout.addLayout(row)
+
+        buttons = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+        # 拖动时滑块每像素都发 valueChanged, 用 30ms 单次定时器
+        # 合并成约 33fps 的刷新, 预览只画最终落点
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(30)
+        self._preview_timer.timeout.connect(self.update_preview)
+        self.update_preview()
+
+    def get_roi(self):
+        """读取当前滑块位置对应的 ROI"""
+        return tuple(self.sliders[k].value()
+                     for k in ("x1", "y1", "x2", "y2"))
+
+    def on_slider_changed(self, _value):
+        self._preview_timer.start()
+
+    def update_preview(self):
+        """在预计算的底图副本上画出当前 ROI 并刷新预览图"""
+        x1, y1, x2, y2 = self.get_roi()
+        s = self._scale
+        pix = QPixmap(self._base_pix)
+        painter = QPainter(pix)
+        painter.setPen(QPen(Qt.red, 2))
+        painter.drawRect(int(x1 * s), int(y1 * s),
+                         int((x2 - x1) * s), int((y2 - y1) * s))
+        painter.end()
+        self.img_label.setPixmap(pix)
+
+
+class MainWindow(QMainWindow):
+    """主窗口: 选视频、调 ROI、启动分析、展示进度"""
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("视频延迟分析工具")
+        self.video_path = None
+        self.app_roi = tuple(config.load_roi_config()["app_roi"])
+        self.worker = None
+
+        central = QWidget()
+        layout = QVBoxLayout(central)
+
+        self.file_label = QLabel("未选择视频")
+        layout.addWidget(self.file_label)
+
+        pick_btn = QPushButton("选择视频...")
+        pick_btn.clicked.connect(self.pick_video)
+        layout.addWidget(pick_btn)
+
+        roi_btn = QPushButton("调整 App 时间 ROI...")
+        roi_btn.clicked.connect(self.adjust_roi)
+        layout.addWidget(roi_btn)
+
+        self.gpu_check = QCheckBox("使用 GPU (需要 CUDA 版 paddle)")
+        layout.addWidget(self.gpu_check)
+
+        self.debug_check = QCheckBox("保存调试帧")
+        layout.addWidget(self.debug_check)
+
+        self.start_btn = QPushButton("开始分析")
+        self.start_btn.clicked.connect(self.start_analysis)
+        layout.addWidget(self.start_btn)
+
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+
+        self.setCentralWidget(central)
+
+    def pick_video(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "选择录屏视频", "", "视频文件 (*.mp4 *.avi *.mkv *.mov)")
+        if path:
+            self.video_path = path
+            self.file_label.setText(path)
+
+    def adjust_roi(self):
+        if not self.video_path:
+            QMessageBox.warning(self, "提示", "请先选择视频")
+            return
+        dialog = ROIAdjustDialog(self.video_path, self.app_roi, self)
+        if dialog.exec_() == QDialog.Accepted:
+            self.app_roi = dialog.get_roi()
+            config.save_roi_config({"app_roi": list(self.app_roi)})
+
+    def start_analysis(self):
+        if not self.video_path:
+            QMessageBox.warning(self, "提示", "请先选择视频")
+            return
+        self.start_btn.setEnabled(False)
+        self.worker = AnalysisWorker(
+            self.video_path, self.app_roi,
+            use_gpu=self.gpu_check.isChecked(),
+            save_debug_frames=self.debug_check.isChecked(), parent=self)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished_ok.connect(self.on_finished)
+        self.worker.failed.connect(self.on_failed)
+        self.worker.start()
+
+    def on_progress(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+
+    def on_finished(self, summary):
+        self.start_btn.setEnabled(True)
+        QMessageBox.information(
+            self, "完成",
+            f"分析完成\nCSV: {summary['csv_path']}\n"
+            f"报告: {summary['html_path']}")
+
+    def on_failed(self, message):
+        self.start_btn.setEnabled(True)
+        QMessageBox.critical(self, "分析失败", message)
+
+
+def main():
+    app = QApplication(sys.argv)
+    window = MainWindow()
+    window.resize(480, 320)
+    window.show()
+    sys.exit(app.exec_())
+
+
+if __name__ == "__main__":
+    main()